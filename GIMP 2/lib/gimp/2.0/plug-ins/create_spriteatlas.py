@@ -6,150 +6,18 @@
 # https://github.com/BdR76/GimpSpriteAtlas/
 
 from gimpfu import *
-import math
 import os
+import sys
 
-layer_rects = []
-spaces = []
-pixel_space = 1
-ATLAS_PLUGIN_VERSION = "v0.3"
-
-# empty space
-class spaceobj(object):
-    def __init__(self, x, y, width, height):
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
-    def __cmp__(self, other):
-        return (self.width * self.height < other.width * other.height)
-    def __lt__(self, other):
-        return (self.width * self.height < other.width * other.height)
-
-# image layer metadata
-class imgRect(object):
-    def __init__(self, n, w, h, i):
-        # process stuff
-        if n.endswith(('.png', '.jpg')):
-            n = os.path.splitext(n)[0]
-        # set parameters
-        self.name = n
-        self.width = w
-        self.height = h
-        self.index  = i
-        # extra stuff
-        self.pack_x = 0
-        self.pack_y = 0
-        self.ext_up = 0
-        self.ext_down = 0
-        self.ext_left = 0
-        self.ext_right = 0
-        # determinate name and optional extend direction, example "green_pipe [ext=UD].png" -> name="green_pipe" ext_up=1 ext_down=1
-        pos1 = n.find('[')
-        pos2 = n.find(']')
-        if pos1 >= 0 and pos2 >= 0 and pos1 < pos2:
-            self.name = n[0:pos1].strip()
-            ex = n[pos1+1:pos2].strip().lower()
-            if ex.startswith("ext="):
-                ex = ex[4:]
-                self.ext_up = 1 if "u" in ex else 0
-                self.ext_down = 1 if "d" in ex else 0
-                self.ext_left = 1 if "l" in ex else 0
-                self.ext_right = 1 if "r" in ex else 0
-        # total width and height, including extruding parts
-        self.tot_width = self.width + self.ext_left + self.ext_right
-        self.tot_height = self.height + self.ext_up + self.ext_down
-    def __cmp__(self, other):
-        return (self.height < other.height)
-    def __lt__(self, other):
-        return (self.height < other.height)
-
-def prepare_layers_metadata(layers):
-    # Collect metadata from all layers as custom list
-    idx = 0
-    area = 0
-    maxWidth = 0
-    for lyr in layers:
-        # layer image metadata
-        n = lyr.name
-        w = lyr.width
-        h = lyr.height
-        newrec = imgRect(n, w, h, idx)
-        layer_rects.append(newrec)
-        # calculate total layer area and maximum layer width
-        area += (newrec.tot_width + pixel_space) * (newrec.tot_height + pixel_space);
-        maxWidth = max(newrec.tot_width + pixel_space, maxWidth + pixel_space)
-        idx = idx + 1
-
-    # sort the layer data for packing by height, descending
-    layer_rects.sort(reverse=True);
-
-    # aim for a square-ish resulting container,
-    # slightly adjusted for sub-100% space utilization
-    startWidth = max(math.ceil(math.sqrt(area / 0.95)), maxWidth)
-
-    # also initialise list of spaces, start with a single empty space based on average layer size
-    spaces.append(spaceobj(0, 0, startWidth, (startWidth+startWidth)))
-    return
-
-def calc_layers_packing():
-    # packing algorithm, explanation and code example by Volodymyr Agafonkin
-    # https://observablehq.com/@mourner/simple-rectangle-packing
-    for box in layer_rects:
-    
-        # look through spaces backwards so that we check smaller spaces first
-        i = len(spaces)-1
-        while i >= 0:
-    
-            space = spaces[i];
-    
-            # look for empty spaces that can accommodate the current box
-            if (box.tot_width > space.width or box.tot_height > space.height):
-                i -= 1;
-                continue;
-    
-            # found the space; add the box to its top-left corner
-            # |-------|-------|
-            # |  box  |       |
-            # |_______|       |
-            # |         space |
-            # |_______________|
-            box.pack_x = space.x + box.ext_left
-            box.pack_y = space.y + box.ext_up
-    
-            if (box.tot_width + pixel_space == space.width and box.tot_height + pixel_space == space.height):
-                # space matches the box exactly; remove it
-                spaces.remove(space)
-    
-            elif (box.tot_height + pixel_space == space.height):
-                # space matches the box height; update it accordingly
-                # |-------|---------------|
-                # |  box  | updated space |
-                # |_______|_______________|
-                spaces[i].x += (box.tot_width + pixel_space);
-                spaces[i].width -= (box.tot_width + pixel_space);
-            elif (box.tot_width + pixel_space == space.width):
-                # space matches the box width; update it accordingly
-                # |---------------|
-                # |      box      |
-                # |_______________|
-                # | updated space |
-                # |_______________|
-                spaces[i].y += (box.tot_height + pixel_space);
-                spaces[i].height -= (box.tot_height + pixel_space);
-            else:
-                # otherwise the box splits the space into two spaces
-                # |-------|-----------|
-                # |  box  | new space |
-                # |_______|___________|
-                # | updated space     |
-                # |___________________|
-                spaces.append(spaceobj(space.x + box.tot_width + pixel_space, space.y, space.width - box.tot_width - pixel_space, box.tot_height + pixel_space));
-                spaces[i].y += (box.tot_height + pixel_space);
-                spaces[i].height -= (box.tot_height + pixel_space);
-            i -= 1;
-            break;
-    return
+# packing core and metadata writers are in the spriteatlas folder next to this plug-in
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from spriteatlas import (AtlasSession, parse_scales, page_filetag, scale_filetag, find_watermark,
+    packing_engine_names, size_policy_names, find_images, can_render_buffers, layer_to_buffer, load_png_buffer)
+
+# maximum texture sizes in the dialog, 0 is no limit
+max_page_sizes = (0, 1024, 2048, 4096, 8192, 16384)
+# compression block sizes in the dialog, 0 is off
+block_sizes = (0, 4, 8)
 
 def extrude_edges_2(img, lyr, x, y, w, h, xgoal, ygoal):
     # render output atlas based on current layer coordinates
@@ -180,27 +48,45 @@ def extrude_edges(img, lyr, x, y, w, h):
     # Move the floating layer into the correct position
     pdb.gimp_layer_translate(floatselection, xOffset, yOffset)
 
-def render_spriteatlas(layers, filename, filetag):
-    # render output atlas based on current layer coordinates
-    
-    # determine total width, height
-    img_w = 0
-    img_h = 0
-    for obj in layer_rects:
-        w = obj.pack_x + obj.width + obj.ext_right
-        h = obj.pack_y + obj.height + obj.ext_up
-        if w > img_w:
-            img_w = w
-        if h > img_h:
-            img_h = h
+def load_previous_page(session, filename, page):
+    # texture of the previous export as pixel buffer, None when it is missing or changed since
+    outputname = session.previous_page_file(filename, page)
+    if outputname is None:
+        return None
+    size = session.previous_pages()[page]
+    imgPrev = pdb.file_png_load(outputname, outputname)
+    lyr = imgPrev.layers[0]
+    buf = None
+    if [lyr.width, lyr.height] == size and not lyr.is_indexed and lyr.bpp <= 4:
+        buf = layer_to_buffer(lyr)
+    gimp.delete(imgPrev)
+    return buf
+
+def render_layers_buffer(newLayer, session, page, buffers, img_w, img_h, previous=None):
+    # compose the atlas in memory and write all pixels to the layer in one go,
+    # with a previous texture only the dirty rectangles are drawn again
+    atlas = session.compose(page, buffers, previous)
+    rgn = newLayer.get_pixel_rgn(0, 0, img_w, img_h, True, False)
+    rgn[0:img_w, 0:img_h] = bytes(atlas.data)
+    newLayer.flush()
+    newLayer.update(0, 0, img_w, img_h)
+    return atlas
+
+def save_buffer_png(buf, filename):
+    # save pixels as png without showing the image
+    imgSave = gimp.Image(buf.width, buf.height, RGB)
+    lyr = gimp.Layer(imgSave, os.path.basename(filename), buf.width, buf.height, RGBA_IMAGE, 100, NORMAL_MODE)
+    imgSave.add_layer(lyr, 0)
+    rgn = lyr.get_pixel_rgn(0, 0, buf.width, buf.height, True, False)
+    rgn[0:buf.width, 0:buf.height] = bytes(buf.data)
+    lyr.flush()
+    outputname = '%s.png' % (filename)
+    pdb.gimp_file_save(imgSave, lyr, outputname, outputname)
+    gimp.delete(imgSave)
 
-    # create new image
-    imgAtlas = gimp.Image(img_w, img_h, RGB)
-    newLayer = gimp.Layer(imgAtlas, filetag, img_w, img_h, RGBA_IMAGE, 100, NORMAL_MODE)
-    imgAtlas.add_layer(newLayer, 1)
-    
-    # copy all layers to new positions
-    for obj in layer_rects:
+def render_layers_clipboard(imgAtlas, newLayer, rects, pagespaces, layers, img_w, img_h, timer):
+    # copy all layers to new positions, timer is session.timer for the export statistics
+    for obj in rects:
 
         # Copy the layer's contents and paste it into a "floating" layer in the new image
         pdb.gimp_edit_copy(layers[obj.index])
@@ -216,15 +102,18 @@ def render_spriteatlas(layers, filename, filetag):
         # Anchor the floating selection before making another selection
         pdb.gimp_floating_sel_anchor(floatingLayer)
 
-        # extrude up, down, left, right
-        if obj.ext_up == 1: # up
-            extrude_edges_2(imgAtlas, newLayer, obj.pack_x, obj.pack_y, obj.width, 1, obj.pack_x, obj.pack_y-1)
-        if obj.ext_down == 1: # down
-            extrude_edges_2(imgAtlas, newLayer, obj.pack_x, obj.pack_y+obj.height-1, obj.width, 1, obj.pack_x, obj.pack_y+obj.height)
-        if obj.ext_left == 1: # left
-            extrude_edges_2(imgAtlas, newLayer, obj.pack_x, obj.pack_y, 1, obj.height, obj.pack_x-1, obj.pack_y)
-        if obj.ext_right == 1: # right
-            extrude_edges_2(imgAtlas, newLayer, obj.pack_x+obj.width-1, obj.pack_y, 1, obj.height, obj.pack_x+obj.width, obj.pack_y)
+        # extrude left, right, then up, down including the corners, one pixel per copy
+        with timer("extrude"):
+            for k in range(1, obj.ext_left + 1): # left
+                extrude_edges_2(imgAtlas, newLayer, obj.pack_x, obj.pack_y, 1, obj.height, obj.pack_x-k, obj.pack_y)
+            for k in range(1, obj.ext_right + 1): # right
+                extrude_edges_2(imgAtlas, newLayer, obj.pack_x+obj.width-1, obj.pack_y, 1, obj.height, obj.pack_x+obj.width-1+k, obj.pack_y)
+            ext_x = obj.pack_x - obj.ext_left
+            ext_w = obj.width + obj.ext_left + obj.ext_right
+            for k in range(1, obj.ext_up + 1): # up
+                extrude_edges_2(imgAtlas, newLayer, ext_x, obj.pack_y, ext_w, 1, ext_x, obj.pack_y-k)
+            for k in range(1, obj.ext_down + 1): # down
+                extrude_edges_2(imgAtlas, newLayer, ext_x, obj.pack_y+obj.height-1, ext_w, 1, ext_x, obj.pack_y+obj.height-1+k)
 
         #pdb.gimp_drawable_set_pixel(floatingLayer, 10, 10, 4, [240, 0,   0, 255])
         #pdb.gimp_drawable_set_pixel(floatingLayer, 11, 10, 4, [240, 0, 240, 255])
@@ -233,214 +122,103 @@ def render_spriteatlas(layers, filename, filetag):
     # Merge the last floating layer into our final 'Spritesheet' layer
     pdb.gimp_image_merge_visible_layers(imgAtlas, 0)
 
-    # look through spaces backwards so that we check smaller spaces first
-    horzmark = True
-    xmark = img_w
-    ymark = img_h
-    spaces.sort(); # sort smallest first
-
-    idx = 0
-    for sp in spaces:
-        # adjust space for out-of-bounds of final image size
-        if (sp.x + sp.width > img_w):
-            sp.width -= (sp.x + sp.width - img_w)
-        if (sp.y + sp.height > img_h):
-            sp.height -= (sp.y + sp.height - img_h)
-        # check if watermark fits inside space
-        idx += 1
-        if (sp.width >= 54 and sp.height >= 8) or (sp.width >= 8 and sp.height >= 54):
-            xmark = sp.x
-            ymark = sp.y
-            horzmark = (sp.width >= 54)
-            break
-
-    #pdb.gimp_message_set_handler(ERROR_CONSOLE)
-    #pdb.gimp_message("xmark=%d ymark=%d" % (xmark, ymark))
-
-    # add small watermark
-    drwLayer = pdb.gimp_image_active_drawable(imgAtlas)
-    pixelwm = [7, 5, 6, 0, 7, 0, 55, 65, 50, 1, 119, 80, 119, 3, 64, 0, 84, 119, 97, 0, 7, 3, 112, 119, 97, 0, 103, 112, 1, 119, 49, 96, 7, 7, 21, 112, 70, 3, 118, 81, 119, 1, 16, 119, 68, 0, 54, 35, 118, 0, 4, 7, 1]
-    for wm in pixelwm:
-        for b in range(0, 7):
-            if wm & (1 << b): # bitwise-and
-                xplot = xmark if horzmark else xmark+8-b
-                yplot = ymark+b if horzmark else ymark
-                if (xplot < img_w and yplot < img_h):
-                    pdb.gimp_drawable_set_pixel(drwLayer, xplot, yplot, 4, [255, 255, 255, 255]) # xposition, yposition, nr-channels-per-pixel(3 or 4), [r,g,b]
-                    #rectimg.putpixel((xplot, yplot), (255,0,255))
-        if horzmark:
-            xmark += 1
+    with timer("watermark"):
+        # look for an empty spot to put the watermark
+        mark = find_watermark(pagespaces, rects, img_w, img_h)
+
+        # add small watermark, all pixels in one region write
+        if mark is not None:
+            xmark, ymark, glyph = mark
+            drwLayer = pdb.gimp_image_active_drawable(imgAtlas)
+            rgn = drwLayer.get_pixel_rgn(xmark, ymark, glyph.width, glyph.height, True, False)
+            rgn[xmark:xmark+glyph.width, ymark:ymark+glyph.height] = bytes(glyph.data)
+            drwLayer.flush()
+            drwLayer.update(xmark, ymark, glyph.width, glyph.height)
+
+def render_spriteatlas(session, layers, buffers, page, filename, filetag, previous=None):
+    # render output atlas of one page based on current layer coordinates,
+    # returns the size and the pixels, None when the layers are copied with the clipboard
+    
+    # determine total width, height
+    img_w, img_h = session.page_size(page)
+
+    # create new image
+    imgAtlas = gimp.Image(img_w, img_h, RGB)
+    newLayer = gimp.Layer(imgAtlas, filetag, img_w, img_h, RGBA_IMAGE, 100, NORMAL_MODE)
+    imgAtlas.add_layer(newLayer, 1)
+
+    # compose in memory when possible, this also leaves the clipboard alone
+    atlas = None
+    with session.timer("render"):
+        if buffers is not None:
+            atlas = render_layers_buffer(newLayer, session, page, buffers, img_w, img_h, previous)
         else:
-            ymark += 1
+            render_layers_clipboard(imgAtlas, newLayer, session.page_rects(page), session.page_spaces(page), layers, img_w, img_h, session.timer)
 
     # save as png
     outputname = '%s.png' % (filename)
-    pdb.gimp_file_save(imgAtlas, imgAtlas.active_layer, outputname, outputname)
+    with session.timer("write"):
+        pdb.gimp_file_save(imgAtlas, imgAtlas.active_layer, outputname, outputname)
 
     # Create and show a new image window for our spritesheet
     gimp.Display(imgAtlas)
     gimp.displays_flush()
-    return img_w, img_h
-
-def write_spriteatlas_jsonarray(filename, filetag, sizex, sizey):
-    stroutput = "{\n\t\"frames\":["
-    
-    # insert all sprite metadata
-    for obj in layer_rects:
-        stroutput += '\n\t\t{"filename":"%s","frame":{"x":%d,"y":%d,"w":%d,"h":%d},"rotated":"false","trimmed":"false",' % (obj.name, obj.pack_x, obj.pack_y, obj.width, obj.height)
-        stroutput += '"spriteSourceSize":{"x":0,"y":0,"w":%d,"h":%d},' % (obj.width, obj.height)
-        stroutput += '"sourceSize":{"w":%d,"h":%d}},' % (obj.width, obj.height)
-
-    # remove last comma
-    stroutput = stroutput[:-1]
-
-    # meta data
-    stroutput += "\n\t],\n"
-    stroutput += "\t\"meta\":{\n"
-    stroutput += "\t\t\"app\":\"https://github.com/BdR76/GimpSpriteAtlas/\",\n"
-    stroutput += "\t\t\"version\":\"GIMP SpriteAtlas plug-in %s\",\n" % ATLAS_PLUGIN_VERSION
-    stroutput += "\t\t\"author\":\"Bas de Reuver\",\n"
-    stroutput += ("\t\t\"image\":\"%s.png\",\n" % filetag)
-    stroutput += ("\t\t\"size\":{\"w\":%d,\"h\":%d},\n" % (sizex, sizey))
-    stroutput += "\t\t\"scale\":1\n"
-    stroutput += "\t}\n"
-    stroutput += "}"
-    
-    # export filename
-    outputname = '%s.json' % (filename)
-
-    # export coordinate variables to textfile
-    outputfile = file(outputname, 'w')
-    outputfile.write(stroutput)
-    outputfile.close()
-    return
-    
-def write_spriteatlas_jsonhash(filename, filetag, img_w, img_h):
-    stroutput = "{\n\t\"frames\":{"
-    
-    # insert all sprite metadata
-    for obj in layer_rects:
-        stroutput += '\n\t\t"%s":{"frame":{"x":%d,"y":%d,"w":%d,"h":%d},"rotated":"false","trimmed":"false",' % (obj.name, obj.pack_x, obj.pack_y, obj.width, obj.height)
-        stroutput += '"spriteSourceSize":{"x":0,"y":0,"w":%d,"h":%d},' % (obj.width, obj.height)
-        stroutput += '"sourceSize":{"w":%d,"h":%d}},' % (obj.width, obj.height)
-
-    # remove last comma
-    stroutput = stroutput[:-1]
-
-    # meta data
-    stroutput += "\n\t},\n"
-    stroutput += "\t\"meta\":{\n"
-    stroutput += "\t\t\"app\":\"https://github.com/BdR76/GimpSpriteAtlas/\",\n"
-    stroutput += "\t\t\"version\":\"GIMP SpriteAtlas plug-in %s\",\n" % ATLAS_PLUGIN_VERSION
-    stroutput += "\t\t\"author\":\"Bas de Reuver\",\n"
-    stroutput += ("\t\t\"image\":\"%s.png\",\n" % filetag)
-    stroutput += ("\t\t\"size\":{\"w\":%d,\"h\":%d},\n" % (img_w, img_h))
-    stroutput += "\t\t\"scale\":1\n"
-    stroutput += "\t}\n"
-    stroutput += "}"
-    
-    # export filename
-    outputname = '%s.json' % (filename)
-
-    # export coordinate variables to textfile
-    outputfile = file(outputname, 'w')
-    outputfile.write(stroutput)
-    outputfile.close()
-    return
-    
-def write_spriteatlas_libgdx(filename, filetag, img_w, img_h):
-
-    stroutput = ("%s.png\nsize: %d,%d\nformat: RGBA8888\nfilter: Linear,Linear\nrepeat: none\n" % (filetag, img_w, img_h))
-
-    # insert all sprite metadata
-    for obj in layer_rects:
-        stroutput +=  ("%s\n  rotate: false\n  xy: %d, %d\n  size: %d, %d\n  orig: %d, %d\n  offset: 0, 0\n  index: -1\n" % (obj.name, obj.pack_x, obj.pack_y, obj.width, obj.height, obj.width, obj.height))
-    
-    # export filename
-    outputname = '%s.atlas' % (filename)
-
-    # export coordinate variables to textfile
-    outputfile = file(outputname, 'w')
-    outputfile.write(stroutput)
-    outputfile.close()
-    return
-    
-def write_spriteatlas_css(filename, filetag):
-    
-    stroutput = "/* GIMP SpriteAtlas plug-in %s by Bas de Reuver 2023 */\n" % ATLAS_PLUGIN_VERSION
-
-    # insert all sprite metadata
-    for obj in layer_rects:
-        stroutput += ".%s {\n" % obj.name
-        stroutput += "\tbackground: url('%s.png') no-repeat -%dpx -%dpx;\n" % (filetag, obj.pack_x, obj.pack_y)
-        stroutput += "\twidth: %dpx;\n" % obj.width
-        stroutput += "\theight: %dpx;\n" % obj.height
-        stroutput += "}\n"
-    
-    # export filename
-    outputname = '%s.css' % (filename)
-
-    # export coordinate variables to textfile
-    outputfile = file(outputname, 'w')
-    outputfile.write(stroutput)
-    outputfile.close()
-    return
-    
-
-def write_spriteatlas_xml(filename, filetag):
-    
-    stroutput = ('<textureatlas xmlns="http://www.w3.org/1999/xhtml" imagepath="%s.png">\n' % filetag)
-    stroutput += '\t<!-- GIMP SpriteAtlas plug-in %s by Bas de Reuver 2023 -->\n' % ATLAS_PLUGIN_VERSION
-
-    # insert all sprite metadata
-    for obj in layer_rects:
-        stroutput += '\t<subtexture name="%s" x="%d" y="%d" width="%d" height="%d">\n' % (obj.name, obj.pack_x, obj.pack_y, obj.width, obj.height)
-        stroutput += '\t</subtexture>\n'
-
-    stroutput += '</textureatlas>\n'
-    
-    # export filename
-    outputname = '%s.xml' % (filename)
-
-    # export coordinate variables to textfile
-    outputfile = file(outputname, 'w')
-    outputfile.write(stroutput)
-    outputfile.close()
-    return
-    
-def create_spriteatlas(image, filetag, foldername, outputtype, padding):
-    global pixel_space
-
-    # create list of all layers
-    layers = image.layers
+    return (img_w, img_h), atlas
+
+def create_spriteatlas(image, filetag, foldername, outputtype, padding, packengine, searchpacking, searchtime, trimsprites, dedupe, rotatesprites, maxpagesize, reuselayout, nameindex, scales, sizepolicy, blockalign, sourcefolder, writestats):
+
+    # all state of this export, nothing is left over from a previous run
+    session = AtlasSession(outputtype, padding, packing_engine_names[packengine], trimsprites, dedupe,
+        rotatesprites, max_page_sizes[maxpagesize], reuselayout, nameindex, parse_scales(scales),
+        size_policy_names[sizepolicy], block_sizes[blockalign], writestats)
+
+    # create list of all layers, or read the png files of a folder instead of the layers,
+    # decoded by GIMP one file at a time and read as pixels, without adding them to an image as layers
+    if sourcefolder:
+        with session.timer("load"):
+            layers = [load_png_buffer(pdb, fn) for fn in find_images(sourcefolder)]
+        if not layers:
+            raise ValueError('no png files found in %s' % sourcefolder)
+    else:
+        layers = image.layers
     numLayers = len(layers)
 
-    # add 1 pixel padding
-    pixel_space = 1 if padding else 0
-
     # Clear any selections on the original image to esure we copy each layer in its entirety
     pdb.gimp_selection_none(image)
-    prepare_layers_metadata(layers)
+
+    # read all layer pixels, trimming and finding identical sprites need the pixels before packing
+    buffers = None
+    if sourcefolder:
+        buffers = layers
+    elif can_render_buffers(layers):
+        with session.timer("load"):
+            buffers = [layer_to_buffer(lyr) for lyr in layers]
+    session.prepare(layers, buffers)
 
     # export filename(s)
     outputname = '%s\\%s' % (foldername, filetag)
 
-    # compile image
-    calc_layers_packing()
-    img_w, img_h = render_spriteatlas(layers, outputname, filetag)
+    # compile image, keep the sprites that did not change in place
+    if not session.reuse(outputname):
+        # no worker processes, these would start another instance of this plug-in script
+        session.pack(searchpacking, searchtime, processes=1)
+
+    # one image per page
+    pages = session.page_count()
+    pagesizes = []
+    for page in range(pages):
+        prevbuf = load_previous_page(session, outputname, page)
+        size, atlas = render_spriteatlas(session, layers, buffers, page, page_filetag(outputname, page, pages), page_filetag(filetag, page, pages), prevbuf)
+        pagesizes.append(size)
+        # smaller variants from the same layout
+        for scale in session.scales[1:]:
+            small = session.downscale(atlas, scale)
+            with session.timer("write"):
+                save_buffer_png(small, page_filetag(scale_filetag(outputname, scale), page, pages))
 
     # write to output file
-    if outputtype == 1:
-        write_spriteatlas_jsonarray(outputname, filetag, img_w, img_h)
-    elif outputtype == 2:
-        write_spriteatlas_jsonhash(outputname, filetag, img_w, img_h)
-    elif outputtype == 3:
-        write_spriteatlas_libgdx(outputname, filetag, img_w, img_h)
-    elif outputtype == 4:
-        write_spriteatlas_css(outputname, filetag)
-    else: # outputtype == 5
-        write_spriteatlas_xml(outputname, filetag)
-    
+    session.write(outputname, filetag, pagesizes)
+
 # Register the plugin with Gimp so it appears in the filters menu
 register(
     "python_fu_create_spriteatlas",
@@ -455,8 +233,22 @@ register(
         (PF_IMAGE, 'image', 'Input image:', None),
         (PF_STRING, "fileName", "Export file name (without extension):", "sprites"),
         (PF_DIRNAME, "outputFolder", "Export to folder:", "/tmp"),
-        (PF_RADIO, "fileType", "Export file type:", 1, (("JSON-TexturePacker Array", 1), ("JSON-TexturePacker Hash", 2), ("libGDX TextureAtlas", 3), ("CSS", 4), ("XML", 5))),
-        (PF_BOOL, "addPadding", "Pad one pixel between sprites:", TRUE)
+        (PF_RADIO, "fileType", "Export file type:", 1, (("JSON-TexturePacker Array", 1), ("JSON-TexturePacker Hash", 2), ("libGDX TextureAtlas", 3), ("CSS", 4), ("XML", 5), ("Binary", 6))),
+        (PF_BOOL, "addPadding", "Pad one pixel between sprites:", TRUE),
+        (PF_OPTION, "packEngine", "Packing algorithm:", 0, ["Shelf (simple rectangle packing)", "MaxRects best short side fit", "MaxRects best area fit", "Skyline bottom-left"]),
+        (PF_BOOL, "searchPacking", "Try all packing algorithms, sort orders\nand widths, keep the smallest texture:", FALSE),
+        (PF_SPINNER, "searchTime", "Time limit for trying (seconds):", 10, (1, 600, 1)),
+        (PF_BOOL, "trimSprites", "Trim transparent borders of sprites:", FALSE),
+        (PF_BOOL, "dedupeSprites", "Pack identical sprites only once:", FALSE),
+        (PF_BOOL, "rotateSprites", "Allow rotating sprites 90 degrees\n(not for CSS and XML):", FALSE),
+        (PF_OPTION, "maxPageSize", "Maximum texture size, more sprites\ngo on the next texture:", 0, ["No limit", "1024 x 1024", "2048 x 2048", "4096 x 4096", "8192 x 8192", "16384 x 16384"]),
+        (PF_BOOL, "reuseLayout", "Keep unchanged sprites in place\nfrom the previous export:", FALSE),
+        (PF_BOOL, "nameIndex", "Write a name index file\n(JSON only):", FALSE),
+        (PF_STRING, "scales", "Also export smaller variants at scales\n(for example 0.5, 0.25):", ""),
+        (PF_OPTION, "sizePolicy", "Texture size:", 0, ["Exact size", "Multiple of 4", "Multiple of 8", "Power of two", "Square power of two"]),
+        (PF_OPTION, "blockAlign", "Pack sprites on whole\ncompression blocks:", 0, ["Off", "4 x 4 (BC, ETC2, ASTC 4x4)", "8 x 8 (ASTC 8x8)"]),
+        (PF_STRING, "sourceFolder", "Read the PNG files of a folder or pattern\ninstead of the layers (empty: use layers):", ""),
+        (PF_BOOL, "writeStats", "Write the time of each step and the\nnumber of sprites to a .stats.json file:", FALSE)
     ],
     [],
     create_spriteatlas, menu="<Image>/Filters/Animation/")
@@ -8,40 +8,37 @@
 # 2022-04-30 script updated by BdR
 
 from gimpfu import *
-import math
-
-def create_spritesheet(image, tileLayout, spriteCenter):
-
-    # Grab all the layers from the original image, each one of which will become an animation frame
-    layers = image.layers
-    numLayers = len(layers)
-
-    # Deterime how many rows and columns we need for each of our layers/animation frames
-    if (tileLayout == 1):
-        numCols = int(math.ceil(math.sqrt(numLayers)))
-        numRows = int(math.ceil(1.0 * numLayers / numCols))
-    else:
-        numRows = 1 if (tileLayout == 2) else numLayers # Single row
-        numCols = 1 if (tileLayout == 3) else numLayers # Single column
-
-    # Determine frame sizes = current image size
-    frameWidth = image.width
-    frameHeight = image.height
-    
-    # Determine new image size, based on the number of rows and columns
-    newImgWidth = frameWidth * numCols
-    newImgHeight = frameHeight * numRows
-
-    # Create a new image and a single layer that fills the entire canvas
-    newImage = gimp.Image(newImgWidth, newImgHeight, RGB)
-    newLayer = gimp.Layer(newImage, "Spritesheet", newImgWidth, newImgHeight, RGBA_IMAGE, 100, NORMAL_MODE)
-    newImage.add_layer(newLayer, 1)
+import os
+import sys
+
+# the buffer compose and batch mode are in the spriteatlas folder next to this plug-in
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from spriteatlas import imgBuffer, rgba_from_bytes, can_render_buffers, load_png_buffer
+from spriteatlas.spritesheet import (calc_sheet_grid, collapse_frames, compose_spritesheet, write_frame_map,
+    create_spritesheet_batch)
+
+def layer_frame_buffer(image, lyr):
+    # pixels of the part of a layer inside the image, same as copying it with everything selected
+    xOffset, yOffset = lyr.offsets
+    x0 = max(xOffset, 0)
+    y0 = max(yOffset, 0)
+    x1 = min(xOffset + lyr.width, image.width)
+    y1 = min(yOffset + lyr.height, image.height)
+    if x1 <= x0 or y1 <= y0:
+        return imgBuffer(0, 0, name=lyr.name)
+    rgn = lyr.get_pixel_rgn(x0 - xOffset, y0 - yOffset, x1 - x0, y1 - y0, False, False)
+    data = rgba_from_bytes(bytearray(rgn[x0-xOffset:x1-xOffset, y0-yOffset:y1-yOffset]), lyr.bpp)
+    return imgBuffer(x1 - x0, y1 - y0, data, lyr.name)
+
+def render_frames_clipboard(image, newImage, newLayer, layers, numRows, numCols, frameWidth, frameHeight, spriteCenter):
+    # copy and paste each layer, for layer types that can't be read as RGBA pixels
 
     # Select image size to ensure uniformly-sized frames (i.e. when original layer is larger than image then "crop" to image size)
     pdb.gimp_selection_all(image)
 
     # go through all layers (GIMP Layers used to be in the reverse order, not anymore)
     layerIndex = 0
+    numLayers = len(layers)
 
     # Loop over our spritesheet grid filling each one row at a time
     for y in xrange(0, numRows):
@@ -77,6 +74,59 @@ def create_spritesheet(image, tileLayout, spriteCenter):
     # Merge the last floating layer into our final 'Spritesheet' layer
     pdb.gimp_image_merge_visible_layers(newImage, 0)
 
+def create_spritesheet(image, tileLayout, spriteCenter, dedupeFrames, outputFolder, fileName, batchFolder):
+
+    # batch mode, one sheet and frame map per animation sequence of a folder, nothing is shown
+    if batchFolder:
+        # the frames are decoded by GIMP one file at a time
+        results = create_spritesheet_batch(batchFolder, outputFolder, tileLayout, spriteCenter, dedupeFrames, processes=1,
+            load=lambda filename: load_png_buffer(pdb, filename))
+        gimp.message("%d sprite sheets written to %s" % (len(results), outputFolder))
+        return
+
+    # Grab all the layers from the original image, each one of which will become an animation frame
+    layers = image.layers
+    numLayers = len(layers)
+
+    # Determine frame sizes = current image size
+    frameWidth = image.width
+    frameHeight = image.height
+
+    # read all frames as pixels when possible, identical consecutive frames can then share one tile
+    frames = None
+    if can_render_buffers(layers):
+        frames = [layer_frame_buffer(image, lyr) for lyr in layers]
+        tiles, framemap = collapse_frames(frames, dedupeFrames)
+        sheet, numCols, numRows = compose_spritesheet(tiles, frameWidth, frameHeight, tileLayout, spriteCenter)
+    else:
+        framemap = list(range(numLayers))
+        numCols, numRows = calc_sheet_grid(numLayers, tileLayout)
+
+    # Determine new image size, based on the number of rows and columns
+    newImgWidth = frameWidth * numCols
+    newImgHeight = frameHeight * numRows
+
+    # Create a new image and a single layer that fills the entire canvas
+    newImage = gimp.Image(newImgWidth, newImgHeight, RGB)
+    newLayer = gimp.Layer(newImage, "Spritesheet", newImgWidth, newImgHeight, RGBA_IMAGE, 100, NORMAL_MODE)
+    newImage.add_layer(newLayer, 1)
+
+    if frames is not None:
+        # all pixels of the sheet in one go
+        rgn = newLayer.get_pixel_rgn(0, 0, newImgWidth, newImgHeight, True, False)
+        rgn[0:newImgWidth, 0:newImgHeight] = bytes(sheet.data)
+        newLayer.flush()
+        newLayer.update(0, 0, newImgWidth, newImgHeight)
+    else:
+        render_frames_clipboard(image, newImage, newLayer, layers, numRows, numCols, frameWidth, frameHeight, spriteCenter)
+
+    # save as png with the frame map next to it
+    if fileName:
+        outputname = os.path.join(outputFolder, fileName)
+        pdb.gimp_file_save(newImage, newImage.active_layer, '%s.png' % outputname, '%s.png' % outputname)
+        write_frame_map(outputname, '%s.png' % fileName, newImgWidth, newImgHeight, frameWidth, frameHeight,
+            numCols, numRows, framemap, [lyr.name for lyr in layers])
+
     # Create and show a new image window for our spritesheet
     gimp.Display(newImage)
     gimp.displays_flush()
@@ -94,7 +144,11 @@ register(
     [
         (PF_IMAGE, "image", "Input image:", None),
         (PF_RADIO, "tileLayout", "Spritesheet layout:", 1, (("Grid", 1), ("Single row", 2), ("Single column", 3))),
-        (PF_BOOL, "spriteCenter", "Center sprite in frame\n(when sprites are smaller)", TRUE)
+        (PF_BOOL, "spriteCenter", "Center sprite in frame\n(when sprites are smaller)", TRUE),
+        (PF_BOOL, "dedupeFrames", "Identical consecutive frames share one tile\n(see the frame map file):", FALSE),
+        (PF_DIRNAME, "outputFolder", "Export to folder:", "/tmp"),
+        (PF_STRING, "fileName", "Export file name, png and frame map\n(empty: only show the sheet):", ""),
+        (PF_STRING, "batchFolder", "Batch: one sheet per animation sequence\nin this folder (empty: use the layers):", "")
     ],
     [],
     create_spritesheet, menu="<Image>/Filters/Animation/")
@@ -0,0 +1,25 @@
+# GIMP SpriteAtlas core
+# Packing, rendering and metadata export without GIMP dependencies,
+# used by the create_spriteatlas.py plug-in and the command line tool
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+from .packing import (spaceobj, imgRect, prepare_layers_metadata, calc_layers_packing,
+    calc_layers_pages, page_count, page_rects, page_spaces,
+    packing_engines, packing_engine_names, size_policy_names, calc_policy_size, calc_policy_max_size,
+    sort_keys, calc_start_width, calc_atlas_size,
+    align_up, align_rect, scaled_layer_rects, occupancyIndex, find_watermark_spot, watermark_box, watermark_pixels)
+from .render import (imgBuffer, rgba_from_bytes, calc_trim_rect, calc_pixel_hash, calc_sprite_info,
+    watermark_buffer, find_watermark, compose_spriteatlas, compose_spriteatlas_strips, recompose_spriteatlas)
+from .cache import (ATLAS_CACHE_VERSION, cache_filename, read_atlas_cache, write_atlas_cache,
+    reuse_layers_packing)
+from .loader import find_images, load_image, load_images, imageFile, imageFiles, read_image_infos
+from .gimplayers import can_render_buffers, layer_to_buffer, load_png_buffer
+from .search import search_layers_packing
+from .nameindex import (NAME_INDEX_MAGIC, NAME_INDEX_VERSION, name_index_filename, calc_name_index,
+    write_name_index, nameIndexFrame, nameIndex, read_name_index)
+from .session import AtlasSession, parse_scales, calc_scale_factors
+from .stats import stats_phase_names, stats_filename, atlasStats, write_atlas_stats
+from .writers import (ATLAS_PLUGIN_VERSION, atlasWriter, atlas_writers, register_writer, page_filetag, scale_filetag,
+    write_spriteatlas, write_spriteatlas_jsonarray, write_spriteatlas_jsonhash, write_spriteatlas_libgdx,
+    write_spriteatlas_css, write_spriteatlas_xml, write_spriteatlas_binary)
@@ -0,0 +1,6 @@
+# run command line tool as: python -m spriteatlas
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,229 @@
+# GIMP SpriteAtlas benchmark
+# Pack and render deterministic synthetic sprite sets with each packing engine and option set,
+# one JSON line per run with the time, memory, texture size and occupancy, so results can be compared over time
+# run as: python -m spriteatlas.benchmark
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import argparse
+import json
+import os
+import platform
+import random
+import struct
+import sys
+import time
+import zlib
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2, no peak memory
+    tracemalloc = None
+
+from .packing import packing_engine_names
+from .render import imgBuffer
+from .session import AtlasSession
+from .writers import ATLAS_PLUGIN_VERSION
+
+# example image of the repository, not there when only the plug-ins are installed
+EXAMPLE_XCF = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', '..', '..', 'example', 'example_sprites.xcf')
+
+# keyword arguments of AtlasSession for each option set
+benchmark_options = [
+    ("default", {}),
+    ("rotate", {"rotate": True}),
+    ("no-padding", {"padding": False}),
+    ("max-size", {"maxsize": 2048}),
+]
+benchmark_option_names = tuple([name for name, kwargs in benchmark_options])
+
+def read_xcf_layer_sizes(filename):
+    # name, width and height of the layers of a GIMP xcf file, only the headers are read
+    with open(filename, 'rb') as f:
+        data = f.read()
+    if data[:9] != b'gimp xcf ':
+        raise ValueError('%s is not a GIMP xcf file' % filename)
+    version = 0 if data[9:13] == b'file' else int(data[10:13])
+    pos = 14 + 12 # magic, width, height, base type
+    if version >= 4:
+        pos += 4 # precision
+    # image properties, type and length, until PROP_END
+    while True:
+        ptype, length = struct.unpack('>II', data[pos:pos + 8])
+        pos += 8 + length
+        if ptype == 0:
+            break
+    # layer offsets, 64-bit from version 11, until a zero
+    fmt = '>Q' if version >= 11 else '>I'
+    size = struct.calcsize(fmt)
+    result = []
+    while True:
+        offset = struct.unpack(fmt, data[pos:pos + size])[0]
+        pos += size
+        if offset == 0:
+            break
+        w, h, ltype, namelen = struct.unpack('>IIII', data[offset:offset + 16])
+        name = data[offset + 16:offset + 16 + namelen - 1].decode('utf-8')
+        result.append((name, w, h))
+    return result
+
+def sizes_uniform(rnd, count):
+    # tiles of a tile map, all the same size
+    return [(32, 32)] * count
+
+def sizes_powerlaw(rnd, count):
+    # many small sprites and a few large ones, like the icons, characters and backgrounds of a game
+    return [(min(256, int(4 * rnd.paretovariate(1.2))), min(256, int(4 * rnd.paretovariate(1.2)))) for i in range(count)]
+
+def sizes_bars(rnd, count):
+    # long thin horizontal and vertical bars, like progress bars and borders
+    result = []
+    for i in range(count):
+        w = rnd.randint(64, 512)
+        h = rnd.randint(2, 8)
+        result.append((w, h) if rnd.random() < 0.5 else (h, w))
+    return result
+
+def sizes_example(rnd, count):
+    # layer sizes of the example image, repeated up to count
+    sizes = [(w, h) for name, w, h in read_xcf_layer_sizes(EXAMPLE_XCF)]
+    return [sizes[i % len(sizes)] for i in range(count)]
+
+benchmark_sets = {
+    "uniform": sizes_uniform,
+    "powerlaw": sizes_powerlaw,
+    "bars": sizes_bars,
+    "example": sizes_example,
+}
+benchmark_set_names = ("uniform", "powerlaw", "bars", "example")
+
+def make_sprites(setname, count, seed=0):
+    # opaque sprites of one set, each with its own color, the same for the same seed
+    rnd = random.Random(zlib.crc32(('%s %d %d' % (setname, count, seed)).encode('ascii')) & 0xffffffff)
+    result = []
+    for i, (w, h) in enumerate(benchmark_sets[setname](rnd, count)):
+        color = bytearray([rnd.randint(0, 255), rnd.randint(0, 255), rnd.randint(0, 255), 255])
+        result.append(imgBuffer(w, h, color * (w * h), 'spr%05d.png' % i))
+    return result
+
+def run_case(sprites, engine, options, strip_height=0):
+    # pack and render once, returns the seconds of both and the session
+    session = AtlasSession(engine=engine, **options)
+    buffers = list(sprites)
+    starttime = time.time()
+    session.prepare(buffers, buffers)
+    session.pack()
+    packtime = time.time() - starttime
+
+    starttime = time.time()
+    pagesizes = []
+    for page in range(session.page_count()):
+        if strip_height > 0:
+            for strip in session.compose_strips(page, buffers, strip_height):
+                pass
+            pagesizes.append(session.page_size(page))
+        else:
+            atlas = session.compose(page, buffers)
+            pagesizes.append((atlas.width, atlas.height))
+            atlas = None
+    rendertime = time.time() - starttime
+    return packtime, rendertime, session, pagesizes
+
+def measure_peak_memory(setname, count, seed, engine, options, strip_height=0):
+    # peak memory in KB from making the sprites to the rendered texture, the sprites are made again
+    # inside the measurement because they are most of the memory, a separate run because tracing makes everything slower
+    if tracemalloc is None:
+        return None
+    tracemalloc.start()
+    try:
+        sprites = make_sprites(setname, count, seed)
+        run_case(sprites, engine, options, strip_height)
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+def benchmark_case(setname, count, engine, optionname, seed=0, strip_height=0, memory=True, sprites=None):
+    # one result record
+    if sprites is None:
+        sprites = make_sprites(setname, count, seed)
+    options = dict(benchmark_options)[optionname]
+    packtime, rendertime, session, pagesizes = run_case(sprites, engine, options, strip_height)
+    spritearea = sum([obj.width * obj.height for obj in session.layer_rects])
+    atlasarea = sum([w * h for w, h in pagesizes])
+    return {
+        "set": setname,
+        "count": len(sprites),
+        "seed": seed,
+        "engine": engine,
+        "options": optionname,
+        "strip_height": strip_height,
+        "pack_seconds": round(packtime, 4),
+        "render_seconds": round(rendertime, 4),
+        "sprite_kb": sum([len(buf.data) for buf in sprites]) // 1024,
+        "peak_kb": measure_peak_memory(setname, count, seed, engine, options, strip_height) if memory else None,
+        "pages": len(pagesizes),
+        "sizes": [[w, h] for w, h in pagesizes],
+        "atlas_pixels": atlasarea,
+        "sprite_pixels": spritearea,
+        "occupancy": round(100.0 * spritearea / atlasarea, 2) if atlasarea else 0.0,
+    }
+
+def run_benchmark(setnames, counts, engines, optionnames, seed=0, strip_height=0, memory=True, output=None):
+    # all combinations, each record is written as one JSON line as soon as it is done
+    environment = {"version": ATLAS_PLUGIN_VERSION, "python": platform.python_version()}
+    results = []
+    for setname in setnames:
+        # the example set has its own number of sprites
+        setcounts = [len(read_xcf_layer_sizes(EXAMPLE_XCF))] if setname == "example" else counts
+        for count in setcounts:
+            sprites = make_sprites(setname, count, seed)
+            for engine in engines:
+                for optionname in optionnames:
+                    record = benchmark_case(setname, count, engine, optionname, seed, strip_height, memory, sprites)
+                    record.update(environment)
+                    results.append(record)
+                    if output is not None:
+                        output.write(json.dumps(record, sort_keys=True) + '\n')
+                        output.flush()
+    return results
+
+def parse_list(text, names=None):
+    items = [item for item in text.replace(',', ' ').split()]
+    if names is not None:
+        for item in items:
+            if item not in names:
+                raise argparse.ArgumentTypeError('unknown "%s", choose from %s' % (item, ', '.join(names)))
+    return items
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='spriteatlas.benchmark',
+        description='Benchmark packing and rendering of synthetic sprite sets (GIMP SpriteAtlas %s), one JSON line per run.' % ATLAS_PLUGIN_VERSION)
+    parser.add_argument('--sets', type=lambda text: parse_list(text, benchmark_set_names),
+        default=[name for name in benchmark_set_names if name != "example" or os.path.isfile(EXAMPLE_XCF)],
+        metavar='LIST', help='sprite sets, from %s (default: all)' % ', '.join(benchmark_set_names))
+    parser.add_argument('--counts', type=lambda text: [int(item) for item in parse_list(text)], default=[100, 1000, 10000, 50000],
+        metavar='LIST', help='numbers of sprites, the example set always has its own (default: 100,1000,10000,50000)')
+    parser.add_argument('--engines', type=lambda text: parse_list(text, packing_engine_names), default=list(packing_engine_names),
+        metavar='LIST', help='packing algorithms (default: all)')
+    parser.add_argument('--options', type=lambda text: parse_list(text, benchmark_option_names), default=list(benchmark_option_names),
+        metavar='LIST', help='option sets, from %s (default: all)' % ', '.join(benchmark_option_names))
+    parser.add_argument('--seed', type=int, default=0, help='random seed of the sprite sizes and colors (default: 0)')
+    parser.add_argument('--strip-height', type=int, default=0, metavar='ROWS', help='render in strips of this many rows (default: all at once)')
+    parser.add_argument('--no-memory', action='store_true', help='skip the extra run that measures peak memory')
+    parser.add_argument('-o', '--output', default=None, help='JSON lines file to append the results to (default: print)')
+    args = parser.parse_args(argv)
+
+    output = open(args.output, 'a') if args.output else sys.stdout
+    try:
+        run_benchmark(args.sets, args.counts, args.engines, args.options, args.seed, args.strip_height, not args.no_memory, output)
+    except (IOError, OSError, ValueError) as e:
+        sys.stderr.write('spriteatlas.benchmark: %s\n' % e)
+        return 1
+    finally:
+        if args.output:
+            output.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+# GIMP SpriteAtlas export cache
+# Remember the layout of the previous export, so unchanged sprites keep their
+# place and only new or changed sprites are packed and drawn again
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import hashlib
+import json
+import os
+
+from .packing import (spaceobj, calc_layers_packing, calc_layers_pages, calc_atlas_size,
+    page_count, page_rects, page_spaces, find_watermark_spot, watermark_box)
+from .writers import page_filetag
+
+ATLAS_CACHE_VERSION = 2
+
+# repack everything when less than this part of the texture is used by sprites
+cache_min_occupancy = 0.6
+
+def cache_filename(filename):
+    return '%s.atlascache' % (filename)
+
+def remove_atlas_cache(filename):
+    # an export that isn't incremental overwrites the texture, so the cache no longer matches it
+    try:
+        os.remove(cache_filename(filename))
+    except OSError:
+        pass
+
+def file_hash(filename):
+    # hash of the file contents, None when it can't be read
+    hsh = hashlib.sha1()
+    try:
+        inputfile = open(filename, 'rb')
+        try:
+            while True:
+                data = inputfile.read(1 << 20)
+                if not data:
+                    break
+                hsh.update(data)
+        finally:
+            inputfile.close()
+    except (IOError, OSError):
+        return None
+    return hsh.hexdigest()
+
+def page_png_filename(filename, page, pages):
+    return '%s.png' % page_filetag(filename, page, pages)
+
+def previous_page_file(filename, cache, page):
+    # png file of a page of the previous export, None when it is missing or was
+    # written by another export since, then its layout doesn't match the cache
+    pages = len(cache["pages"])
+    if page >= pages:
+        return None
+    pngname = page_png_filename(filename, page, pages)
+    if file_hash(pngname) != cache["pagehashes"][page]:
+        return None
+    return pngname
+
+def read_atlas_cache(filename):
+    # previous layout, None when there is no usable cache file
+    try:
+        inputfile = open(cache_filename(filename), 'r')
+        try:
+            cache = json.load(inputfile)
+        finally:
+            inputfile.close()
+    except (IOError, OSError, ValueError):
+        return None
+    if not isinstance(cache, dict) or cache.get("version") != ATLAS_CACHE_VERSION:
+        return None
+    return cache
+
+def watermark_rect(spaces, layer_rects, img_w, img_h):
+    # x, y, w, h around the watermark pixels, None when there was no room for it
+    xmark, ymark, horzmark = find_watermark_spot(spaces, img_w, img_h, layer_rects)
+    x, y, w, h = watermark_box(xmark, ymark, horzmark)
+    if x + w > img_w or y + h > img_h:
+        return None
+    return [x, y, w, h]
+
+def write_atlas_cache(filename, layer_rects, spaces, pixel_space, hashes, settings, pagesizes):
+    # store the layout and content hash of all packed sprites next to the export,
+    # hashes in same order as the layers, settings is a dict of the export options,
+    # the textures have to be written first, their file hash is stored as well
+    sprites = []
+    for obj in layer_rects:
+        sprites.append({
+            "name": obj.name,
+            "hash": hashes[obj.index],
+            "width": obj.tot_width,
+            "height": obj.tot_height,
+            "rotated": obj.rotated,
+            "page": obj.page,
+            "x": obj.pack_x,
+            "y": obj.pack_y,
+            # area taken in the texture, including extruded edges and padding
+            "box": [obj.pack_x - obj.ext_left, obj.pack_y - obj.ext_up, obj.tot_width + pixel_space, obj.tot_height + pixel_space],
+        })
+    watermarks = []
+    for page, (img_w, img_h) in enumerate(pagesizes):
+        watermarks.append(watermark_rect(page_spaces(spaces, page), page_rects(layer_rects, page), img_w, img_h))
+    cache = {
+        "version": ATLAS_CACHE_VERSION,
+        "settings": settings,
+        "pages": [list(size) for size in pagesizes],
+        "pagehashes": [file_hash(page_png_filename(filename, page, len(pagesizes))) for page in range(len(pagesizes))],
+        "watermarks": watermarks,
+        "sprites": sprites,
+        "spaces": [[sp.x, sp.y, sp.width, sp.height, sp.page] for sp in spaces],
+    }
+    outputfile = open(cache_filename(filename), 'w')
+    json.dump(cache, outputfile, sort_keys=True)
+    outputfile.close()
+
+def reuse_layers_packing(layer_rects, spaces, pixel_space, cache, hashes, settings, maxsize=0, threshold=None):
+    # keep unchanged sprites at their cached position and pack new or changed
+    # sprites into the free spaces, hashes in same order as the layers
+    # returns the dirty (page, x, y, w, h) rectangles that have to be drawn again,
+    # or None when a full repack is needed, then layer_rects and spaces are left as they were
+    if threshold is None:
+        threshold = cache_min_occupancy
+    if cache is None or cache.get("settings") != settings:
+        return None
+    rotated = [obj.rotated for obj in layer_rects]
+    result = try_reuse_packing(layer_rects, pixel_space, cache, hashes, maxsize, threshold)
+    if result is None:
+        for obj, rot in zip(layer_rects, rotated):
+            obj.page = 0
+            if obj.rotated != rot:
+                obj.rotate()
+        return None
+    freespaces, dirty = result
+    spaces[:] = freespaces
+    return dirty
+
+def try_reuse_packing(layer_rects, pixel_space, cache, hashes, maxsize, threshold):
+    # returns the free spaces and the dirty rectangles, or None
+    # sprites with a unique name in the cache
+    entries = {}
+    for entry in cache["sprites"]:
+        entries[entry["name"]] = None if entry["name"] in entries else entry
+
+    dirty = []
+    todo = []
+    spaces = []
+    for obj in layer_rects:
+        entry = entries.pop(obj.name, None)
+        if entry is not None and entry["hash"] == hashes[obj.index]:
+            if obj.rotated != entry["rotated"]:
+                obj.rotate()
+            if (obj.tot_width, obj.tot_height) == (entry["width"], entry["height"]):
+                obj.pack_x = entry["x"]
+                obj.pack_y = entry["y"]
+                obj.page = entry["page"]
+                continue
+        if entry is not None:
+            entries[obj.name] = entry
+        todo.append(obj)
+
+    # areas of removed and changed sprites become free space
+    for x, y, w, h, page in cache["spaces"]:
+        space = spaceobj(x, y, w, h)
+        space.page = page
+        spaces.append(space)
+    for entry in entries.values():
+        if entry is None:
+            continue
+        x, y, w, h = entry["box"]
+        space = spaceobj(x, y, w, h)
+        space.page = entry["page"]
+        spaces.append(space)
+        dirty.append((entry["page"], x, y, w, h))
+
+    # pack into the free spaces page by page, MaxRects because the free spaces can overlap
+    pages = len(cache["pages"])
+    for page in range(pages):
+        if not todo:
+            break
+        pagespaces = page_spaces(spaces, page)
+        for obj in todo:
+            obj.pack_x = -1
+        calc_layers_packing(todo, pagespaces, pixel_space, "maxrects-bssf")
+        for space in pagespaces:
+            space.page = page
+        spaces[:] = [space for space in spaces if space.page != page] + pagespaces
+        for obj in todo:
+            if obj.pack_x >= 0:
+                obj.page = page
+                dirty.append((page, obj.pack_x - obj.ext_left, obj.pack_y - obj.ext_up, obj.tot_width + pixel_space, obj.tot_height + pixel_space))
+        todo = [obj for obj in todo if obj.pack_x < 0]
+    if todo:
+        if maxsize <= 0:
+            return None
+        # sprites that don't fit go on new pages
+        newspaces = []
+        calc_layers_pages(todo, newspaces, pixel_space, maxsize)
+        for obj in todo:
+            obj.page += pages
+        for space in newspaces:
+            space.page += pages
+        spaces.extend(newspaces)
+
+    # the watermark of the previous export is redrawn
+    for page, rect in enumerate(cache["watermarks"]):
+        if rect is not None:
+            dirty.append((page, rect[0], rect[1], rect[2], rect[3]))
+
+    # too much unused space left, better to start over
+    used = 0
+    for obj in layer_rects:
+        used += obj.tot_width * obj.tot_height
+    total = 0
+    for page in range(page_count(layer_rects)):
+        rects = page_rects(layer_rects, page)
+        if not rects:
+            # all sprites of this page are gone
+            return None
+        img_w, img_h = calc_atlas_size(rects)
+        total += img_w * img_h
+    if used < threshold * total:
+        return None
+    return spaces, dirty
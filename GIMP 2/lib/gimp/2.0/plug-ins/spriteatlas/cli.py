@@ -0,0 +1,134 @@
+# GIMP SpriteAtlas command line tool
+# Compile a folder of PNG images into a spriteatlas without GIMP
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import argparse
+import os
+import sys
+
+from .loader import load_images, read_image_infos, imageFiles
+from .packing import packing_engine_names, size_policy_names
+from .pngio import read_png, write_png, pngWriter
+from .render import imgBuffer
+from .session import AtlasSession, parse_scales
+from .writers import ATLAS_PLUGIN_VERSION, atlas_writers, page_filetag, scale_filetag
+
+# export file types, same numbering as the plug-in dialog
+output_types = dict((writer.name, outputtype) for outputtype, writer in atlas_writers.items())
+
+def load_previous_page(outputname, session, page):
+    # texture of the previous export, None when it is missing or changed since
+    pngname = session.previous_page_file(outputname, page)
+    if pngname is None:
+        return None
+    try:
+        w, h, data = read_png(pngname)
+    except (IOError, OSError, ValueError):
+        return None
+    if [w, h] != session.previous_pages()[page]:
+        return None
+    return imgBuffer(w, h, data)
+
+def write_page_strips(outputname, session, page, pages, layers, stripheight):
+    # write the texture and its smaller variants while it is composed, one strip of rows at a time
+    img_w, img_h = session.page_size(page)
+    writers = []
+    for scale in session.scales:
+        w, h = session.variant_size(img_w, img_h, scale)
+        writers.append((int(round(1.0 / scale)), pngWriter('%s.png' % page_filetag(scale_filetag(outputname, scale), page, pages), w, h)))
+    with session.timer("render"):
+        for strip in session.compose_strips(page, layers, stripheight):
+            for factor, writer in writers:
+                small = strip if factor == 1 else strip.downscaled(factor)
+                with session.timer("write"):
+                    writer.write_rows(small)
+        with session.timer("write"):
+            for factor, writer in writers:
+                writer.close()
+    return img_w, img_h
+
+def create_spriteatlas_folder(inputfolder, filetag, foldername, outputtype, padding, engine="shelf",
+        search=False, timebudget=10.0, processes=None, trim=False, dedupe=False, rotate=False, maxsize=0, incremental=False,
+        nameindex=False, scales=None, sizepolicy="exact", blockalign=0, stripheight=0, stats=False):
+    # same steps as the GIMP plug-in, but with png files as layers, inputfolder can also be a pattern
+    session = AtlasSession(outputtype, padding, engine, trim, dedupe, rotate, maxsize, incremental, nameindex, scales,
+        sizepolicy, blockalign, stats)
+    if stripheight > 0:
+        # only the size, trim rectangle and hash of each file are kept, in strips each file
+        # is read again when the first strip reaches its sprite, so the sprites aren't all in memory
+        with session.timer("load"):
+            files, infos = read_image_infos(inputfolder, session.sprite_options(), processes)
+        layers = imageFiles(files)
+        if not files:
+            raise ValueError('no png files found in %s' % inputfolder)
+        session.prepare(files, None, infos)
+    else:
+        with session.timer("load"):
+            layers = load_images(inputfolder, processes)
+        if not layers:
+            raise ValueError('no png files found in %s' % inputfolder)
+        session.prepare(layers, layers)
+
+    # export filename(s)
+    outputname = os.path.join(foldername, filetag)
+
+    # keep the sprites that did not change in place, or pack all
+    if not session.reuse(outputname):
+        session.pack(search, timebudget, processes)
+
+    pages = session.page_count()
+    pagesizes = []
+    for page in range(pages):
+        previous = load_previous_page(outputname, session, page)
+        if stripheight > 0 and previous is None:
+            # updating the previous texture needs all of it, so only a new texture is written in strips
+            pagesizes.append(write_page_strips(outputname, session, page, pages, layers, stripheight))
+            continue
+        atlas = session.compose(page, layers, previous)
+        with session.timer("write"):
+            write_png('%s.png' % page_filetag(outputname, page, pages), atlas.width, atlas.height, atlas.data)
+        # smaller variants from the same layout
+        for scale in session.scales[1:]:
+            small = session.downscale(atlas, scale)
+            with session.timer("write"):
+                write_png('%s.png' % page_filetag(scale_filetag(outputname, scale), page, pages), small.width, small.height, small.data)
+        pagesizes.append((atlas.width, atlas.height))
+    session.write(outputname, filetag, pagesizes)
+    return pagesizes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='spriteatlas',
+        description='Create a sprite texture image from a folder of PNG images (GIMP SpriteAtlas %s).' % ATLAS_PLUGIN_VERSION)
+    parser.add_argument('inputfolder', help='folder with the sprite PNG files, or a pattern like "sprites/*.png"')
+    parser.add_argument('-n', '--name', default='sprites', help='export file name without extension (default: sprites)')
+    parser.add_argument('-o', '--output', default='.', help='export folder (default: current folder)')
+    parser.add_argument('-t', '--type', default='jsonarray', choices=sorted(output_types), help='export file type (default: jsonarray)')
+    parser.add_argument('--no-padding', action='store_true', help='do not pad one pixel between sprites')
+    parser.add_argument('-e', '--engine', default='shelf', choices=packing_engine_names, help='packing algorithm (default: shelf)')
+    parser.add_argument('--search', action='store_true', help='try all packing algorithms with several sort orders and widths, keep the smallest atlas')
+    parser.add_argument('--time-budget', type=float, default=10.0, metavar='SECONDS', help='time limit for --search (default: 10)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of processes to read the PNG files and for --search (default: all cores)')
+    parser.add_argument('--trim', action='store_true', help='trim transparent borders of the sprites')
+    parser.add_argument('--dedupe', action='store_true', help='pack sprites with identical pixels only once')
+    parser.add_argument('--rotate', action='store_true', help='allow rotating sprites 90 degrees (not for css and xml)')
+    parser.add_argument('--max-size', type=int, default=0, metavar='PIXELS', help='maximum texture width and height, put the remaining sprites on more pages (default: no limit)')
+    parser.add_argument('--incremental', action='store_true', help='keep unchanged sprites in place from the previous export, remembered in a .atlascache file')
+    parser.add_argument('--scales', type=parse_scales, default=None, metavar='LIST', help='also export smaller variants from the same layout, for example "0.5,0.25"')
+    parser.add_argument('--size-policy', default='exact', choices=size_policy_names, help='round the texture size up for the GPU (default: exact)')
+    parser.add_argument('--block-align', type=int, default=0, metavar='PIXELS', help='pack sprites on whole texture compression blocks, for example 4 (default: off)')
+    parser.add_argument('--strip-height', type=int, default=0, metavar='ROWS', help='compose and write the texture in strips of this many rows, for huge textures with little memory (default: all at once)')
+    parser.add_argument('--stats', action='store_true', help='write the time of each phase, sprite count and occupancy to a .stats.json file and the JSON meta block')
+    parser.add_argument('--name-index', action='store_true', help='write a .nameidx file to find frames by name (jsonarray and jsonhash only)')
+    args = parser.parse_args(argv)
+
+    try:
+        pagesizes = create_spriteatlas_folder(args.inputfolder, args.name, args.output, output_types[args.type], not args.no_padding, args.engine,
+            args.search, args.time_budget, args.jobs, args.trim, args.dedupe, args.rotate, args.max_size, args.incremental,
+            args.name_index, args.scales, args.size_policy, args.block_align, args.strip_height, args.stats)
+    except (IOError, OSError, ValueError) as e:
+        sys.stderr.write('spriteatlas: %s\n' % e)
+        return 1
+    for page, (img_w, img_h) in enumerate(pagesizes):
+        print('%s: %dx%d' % (page_filetag(os.path.join(args.output, args.name), page, len(pagesizes)), img_w, img_h))
+    return 0
@@ -0,0 +1,40 @@
+# GIMP SpriteAtlas layer pixels
+# Pixel buffers from GIMP layers and from PNG files opened by GIMP, for the plug-ins,
+# the GIMP objects are passed in so the package itself doesn't need GIMP
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import os
+
+from .render import imgBuffer, rgba_from_bytes
+
+# GIMP_PRECISION_U8_GAMMA, 8 bits per channel
+PRECISION_U8_GAMMA = 150
+
+def can_render_buffers(layers):
+    # pixel buffers are 8-bit RGBA, other layer types are copied with the clipboard
+    for lyr in layers:
+        if lyr.is_indexed or lyr.bpp > 4:
+            return False
+    return True
+
+def layer_to_buffer(lyr, name=None):
+    # read all pixels of a layer at once as RGBA
+    rgn = lyr.get_pixel_rgn(0, 0, lyr.width, lyr.height, False, False)
+    data = rgba_from_bytes(bytearray(rgn[0:lyr.width, 0:lyr.height]), lyr.bpp)
+    return imgBuffer(lyr.width, lyr.height, data, lyr.name if name is None else name)
+
+def load_png_buffer(pdb, filename):
+    # pixels of one png file decoded by GIMP's own PNG loader, without adding it as a layer,
+    # named after the file so "[ext=..]" in the filename works the same as in a layer name
+    img = pdb.file_png_load(filename, filename)
+    try:
+        lyr = img.layers[0]
+        if lyr.is_indexed:
+            pdb.gimp_image_convert_rgb(img)
+        if lyr.bpp > 4:
+            # 16-bit PNG files
+            pdb.gimp_image_convert_precision(img, PRECISION_U8_GAMMA)
+        return layer_to_buffer(img.layers[0], os.path.basename(filename))
+    finally:
+        pdb.gimp_image_delete(img)
@@ -0,0 +1,72 @@
+# GIMP SpriteAtlas image loader
+# Read a folder or glob of PNG files straight into pixel buffers, decoded in parallel,
+# so the sprites don't have to be opened as layers in GIMP first
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import glob
+import multiprocessing
+import os
+
+from .pngio import read_png
+from .render import imgBuffer, calc_sprite_info
+
+def find_images(source):
+    # png files in a folder, or matching a pattern like "sprites/walk_*.png", sorted by filename
+    if os.path.isdir(source):
+        filenames = [os.path.join(source, fn) for fn in os.listdir(source)]
+    else:
+        filenames = glob.glob(source)
+    filenames = [fn for fn in filenames if fn.lower().endswith('.png') and os.path.isfile(fn)]
+    return sorted(filenames, key=os.path.basename)
+
+def load_image(filename):
+    # pixels of one png file, named after the file so "[ext=..]" in the filename works the same as in a layer name
+    w, h, data = read_png(filename)
+    return imgBuffer(w, h, data, os.path.basename(filename))
+
+# size and name of a png file without its pixels, used as a layer when the pixels are read again to draw it
+class imageFile(object):
+    def __init__(self, filename, width, height):
+        self.filename = filename
+        self.name = os.path.basename(filename)
+        self.width = width
+        self.height = height
+
+# pixels of image files in place of a list of buffers, a file is decoded each time a sprite is drawn from it
+class imageFiles(object):
+    def __init__(self, files):
+        self.files = files
+
+    def __len__(self):
+        return len(self.files)
+
+    def __getitem__(self, index):
+        return load_image(self.files[index].filename)
+
+def map_files(function, items, processes=None):
+    # processes=None uses all cores, processes=1 decodes one file at a time,
+    # worker processes because the decoding is Python code that threads can't run at the same time
+    if processes == 1 or len(items) < 2:
+        return [function(item) for item in items]
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(function, items)
+    finally:
+        pool.terminate()
+
+def load_images(source, processes=None):
+    # decode all png files of a folder or pattern, in the same order as find_images
+    return map_files(load_image, find_images(source), processes)
+
+def read_image_info(job):
+    # imageFile and calc_sprite_info of one png file, the pixels are not kept
+    filename, options = job
+    buf = load_image(filename)
+    return imageFile(filename, buf.width, buf.height), calc_sprite_info(buf, *options)
+
+def read_image_infos(source, options, processes=None):
+    # imageFile and calc_sprite_info of all png files of a folder or pattern, options are the
+    # calc_sprite_info arguments, so only one file at a time is in memory in each process
+    results = map_files(read_image_info, [(fn, options) for fn in find_images(source)], processes)
+    return [result[0] for result in results], [result[1] for result in results]
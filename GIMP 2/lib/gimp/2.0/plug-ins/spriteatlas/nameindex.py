@@ -0,0 +1,177 @@
+# GIMP SpriteAtlas name index
+# Minimal perfect hash from sprite name to frame, written next to the JSON file
+# so a game can find a frame without building its own hash map of all names
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import collections
+import mmap
+import struct
+
+from .writers import all_frames, utf8_bytes
+
+# index file, all numbers little-endian:
+# header, seed table, slot table and a string pool with the utf-8 names,
+# each name ends with a zero byte, name offsets are from the start of the string pool
+NAME_INDEX_MAGIC = b'SAIX'
+NAME_INDEX_VERSION = 2
+# magic, version, number of names, salt of the name hashes, string pool size
+name_index_header = struct.Struct('<4sH2xIII')
+# one seed per bucket, a negative seed -n-1 is directly slot n
+name_index_seed = struct.Struct('<i')
+# one slot per name: page, flags, frame number in the texture, the frame data of the JSON file
+# (frame x, y, w, h, spriteSourceSize x, y, sourceSize w, h), name length and name offset
+name_index_slot = struct.Struct('<HH11I')
+# slot flags
+NAME_INDEX_ROTATED = 1
+NAME_INDEX_TRIMMED = 2
+
+# give up on a salt when a bucket needs more seeds than this, and on the names after this many salts
+name_index_max_seed = 100000
+name_index_max_salt = 32
+
+# frame of a name, the same numbers as the JSON file
+nameIndexFrame = collections.namedtuple('nameIndexFrame', ('page', 'number', 'x', 'y', 'w', 'h', 'rotated', 'trimmed',
+    'trim_x', 'trim_y', 'src_width', 'src_height'))
+
+def name_index_filename(filename):
+    return '%s.nameidx' % (filename)
+
+def fnv_hash(data, salt=0):
+    # 64-bit FNV-1a of the salt as 4 bytes followed by the utf-8 name
+    h = 0xcbf29ce484222325
+    for c in bytearray(struct.pack('<I', salt) + data):
+        h = ((h ^ c) * 0x100000001b3) & 0xffffffffffffffff
+    return h
+
+def mix_hash(h):
+    # MurmurHash3 64-bit finalizer, every input bit changes about half of the output bits
+    h ^= h >> 33
+    h = (h * 0xff51afd7ed558ccd) & 0xffffffffffffffff
+    h ^= h >> 33
+    h = (h * 0xc4ceb9fe1a85ec53) & 0xffffffffffffffff
+    h ^= h >> 33
+    return h
+
+def name_hash(seed, h):
+    # hash of a name for a seed, h is the FNV hash of the name so it is only calculated once
+    return mix_hash(h ^ mix_hash(seed))
+
+def calc_name_slots(hashes):
+    # hash and displace, the names are put in buckets by their hash with seed 0,
+    # then for the fullest buckets first a seed is searched that puts all its names in free slots,
+    # the names of buckets with one name go directly in the remaining slots
+    # returns the seeds and, per slot, the position in hashes, or None when a bucket needs too many seeds
+    count = len(hashes)
+    buckets = [[] for i in range(count)]
+    for i, h in enumerate(hashes):
+        buckets[name_hash(0, h) % count].append(i)
+    seeds = [0] * count
+    slots = [None] * count
+    for bucket in sorted(range(count), key=lambda b: -len(buckets[b])):
+        items = buckets[bucket]
+        if len(items) <= 1:
+            break
+        for seed in range(1, name_index_max_seed + 1):
+            used = [name_hash(seed, hashes[i]) % count for i in items]
+            if len(set(used)) == len(used) and all(slots[slot] is None for slot in used):
+                break
+        else:
+            return None
+        seeds[bucket] = seed
+        for slot, i in zip(used, items):
+            slots[slot] = i
+    free = [slot for slot in range(count) if slots[slot] is None]
+    for bucket in range(count):
+        if len(buckets[bucket]) == 1:
+            slot = free.pop()
+            seeds[bucket] = -slot - 1
+            slots[slot] = buckets[bucket][0]
+    return seeds, slots
+
+def calc_name_index(names):
+    # the names have to be different, when two of them get the same hash no seed can separate them,
+    # then all hashes are calculated again with the next salt
+    # returns the salt, the seeds and, per slot, the position in names
+    for salt in range(name_index_max_salt):
+        hashes = [fnv_hash(name, salt) for name in names]
+        if len(set(hashes)) < len(hashes):
+            continue
+        result = calc_name_slots(hashes)
+        if result is not None:
+            return (salt,) + result
+    raise ValueError('no name index found for %d names' % len(names))
+
+def name_index_flags(obj):
+    return (NAME_INDEX_ROTATED if obj.rotated else 0) | (NAME_INDEX_TRIMMED if obj.trimmed else 0)
+
+def write_name_index(filename, layer_rects, pages):
+    # frame numbers are the order of the frames of each texture in the JSON file,
+    # with the same name more than once the last one is used, same as a JSON parser
+    frames = {}
+    for page in range(pages):
+        for number, obj in enumerate([obj for obj in all_frames(layer_rects) if obj.page == page]):
+            w, h = obj.frame_size()
+            frames[utf8_bytes(obj.name)] = (page, name_index_flags(obj), number, obj.pack_x, obj.pack_y, w, h,
+                obj.trim_x, obj.trim_y, obj.src_width, obj.src_height)
+    names = sorted(frames)
+    salt, seeds, slots = calc_name_index(names)
+
+    pool = bytearray()
+    table = []
+    for i in slots:
+        table.append(name_index_slot.pack(*(frames[names[i]] + (len(names[i]), len(pool)))))
+        pool.extend(names[i] + b'\x00')
+
+    outputfile = open(name_index_filename(filename), 'wb')
+    outputfile.write(name_index_header.pack(NAME_INDEX_MAGIC, NAME_INDEX_VERSION, len(names), salt, len(pool)))
+    outputfile.write(b''.join([name_index_seed.pack(seed) for seed in seeds]))
+    outputfile.write(b''.join(table))
+    outputfile.write(bytes(pool))
+    outputfile.close()
+
+# reference loader, the index file is memory mapped and nothing is read until a lookup
+class nameIndex(object):
+    def __init__(self, filename):
+        self.file = open(filename, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file can't be mapped
+            self.file.close()
+            raise ValueError('%s is not a name index file' % filename)
+        if len(self.data) < name_index_header.size:
+            self.close()
+            raise ValueError('%s is not a name index file' % filename)
+        magic, version, self.count, self.salt, poolsize = name_index_header.unpack_from(self.data, 0)
+        if magic != NAME_INDEX_MAGIC or version != NAME_INDEX_VERSION:
+            self.close()
+            raise ValueError('%s is not a name index file' % filename)
+        self.slotpos = name_index_header.size + self.count * name_index_seed.size
+        self.poolpos = self.slotpos + self.count * name_index_slot.size
+
+    def lookup(self, name):
+        # frame of a sprite name, None for an unknown name
+        if self.count == 0:
+            return None
+        data = utf8_bytes(name)
+        h = fnv_hash(data, self.salt)
+        seed = name_index_seed.unpack_from(self.data, name_index_header.size + (name_hash(0, h) % self.count) * name_index_seed.size)[0]
+        if seed < 0:
+            slot = -seed - 1
+        else:
+            slot = name_hash(seed, h) % self.count
+        values = name_index_slot.unpack_from(self.data, self.slotpos + slot * name_index_slot.size)
+        page, flags, number, x, y, w, h, trim_x, trim_y, src_width, src_height, length, offset = values
+        # every name lands in some slot, so compare the name
+        if length != len(data) or self.data[self.poolpos + offset:self.poolpos + offset + length] != data:
+            return None
+        return nameIndexFrame(page, number, x, y, w, h, bool(flags & NAME_INDEX_ROTATED), bool(flags & NAME_INDEX_TRIMMED),
+            trim_x, trim_y, src_width, src_height)
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+def read_name_index(filename):
+    return nameIndex(filename)
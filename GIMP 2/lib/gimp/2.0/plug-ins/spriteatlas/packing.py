@@ -0,0 +1,732 @@
+# GIMP SpriteAtlas packing core
+# Rectangle packing of sprite metadata, no GIMP dependencies
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import math
+import os
+
+# empty space
+class spaceobj(object):
+    def __init__(self, x, y, width, height):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.page = 0
+    def __cmp__(self, other):
+        return (self.width * self.height < other.width * other.height)
+    def __lt__(self, other):
+        return (self.width * self.height < other.width * other.height)
+
+# image layer metadata, fixed attributes so thousands of sprites take little memory
+class imgRect(object):
+    __slots__ = ('name', 'width', 'height', 'index', 'pack_x', 'pack_y', 'page',
+        'trimmed', 'trim_x', 'trim_y', 'src_width', 'src_height', 'aliases', 'rotated', 'can_rotate',
+        'ext_up', 'ext_down', 'ext_left', 'ext_right', 'tot_width', 'tot_height')
+    def __init__(self, n, w, h, i):
+        # process stuff
+        if os.path.splitext(n)[1].lower() in ('.png', '.jpg'):
+            n = os.path.splitext(n)[0]
+        # set parameters
+        self.name = n
+        self.width = w
+        self.height = h
+        self.index  = i
+        # extra stuff
+        self.pack_x = 0
+        self.pack_y = 0
+        self.page = 0
+        # trimmed transparent border, width and height are the trimmed size
+        self.trimmed = False
+        self.trim_x = 0
+        self.trim_y = 0
+        self.src_width = w
+        self.src_height = h
+        # other layers with identical pixels, these share the packed position
+        self.aliases = []
+        # turned 90 degrees in the texture, width and height are the size in the texture
+        self.rotated = False
+        self.can_rotate = False
+        self.ext_up = 0
+        self.ext_down = 0
+        self.ext_left = 0
+        self.ext_right = 0
+        # determinate name and optional extend direction, example "green_pipe [ext=UD].png" -> name="green_pipe" ext_up=1 ext_down=1
+        # and optional extend width, example "grass [ext=UDLR:4].png" -> name="grass" ext_up=4 ext_down=4 ext_left=4 ext_right=4
+        pos1 = n.find('[')
+        pos2 = n.find(']')
+        if pos1 >= 0 and pos2 >= 0 and pos1 < pos2:
+            self.name = n[0:pos1].strip()
+            ex = n[pos1+1:pos2].strip().lower()
+            if ex.startswith("ext="):
+                ex = ex[4:]
+                ext = 1
+                if ":" in ex:
+                    ex, extwidth = ex.split(":", 1)
+                    if extwidth.strip().isdigit():
+                        ext = int(extwidth)
+                self.ext_up = ext if "u" in ex else 0
+                self.ext_down = ext if "d" in ex else 0
+                self.ext_left = ext if "l" in ex else 0
+                self.ext_right = ext if "r" in ex else 0
+        # total width and height, including extruding parts
+        self.tot_width = self.width + self.ext_left + self.ext_right
+        self.tot_height = self.height + self.ext_up + self.ext_down
+    def set_trim(self, x, y, w, h):
+        # only pack the rectangle x,y,w,h of the layer
+        self.trimmed = (w != self.src_width or h != self.src_height)
+        self.trim_x = x
+        self.trim_y = y
+        self.width = w
+        self.height = h
+        self.tot_width = self.width + self.ext_left + self.ext_right
+        self.tot_height = self.height + self.ext_up + self.ext_down
+    def align_edges(self, grid):
+        # extruded edges as multiples of grid, so the sprite position stays on the grid
+        self.ext_up = align_up(self.ext_up, grid)
+        self.ext_down = align_up(self.ext_down, grid)
+        self.ext_left = align_up(self.ext_left, grid)
+        self.ext_right = align_up(self.ext_right, grid)
+        self.tot_width = self.width + self.ext_left + self.ext_right
+        self.tot_height = self.height + self.ext_up + self.ext_down
+    def align_box(self, grid, pixel_space):
+        # room right and below so the box including padding is a multiple of grid,
+        # packed from a top-left on the grid the box covers whole blocks of the texture
+        self.tot_width = align_up(self.tot_width + pixel_space, grid) - pixel_space
+        self.tot_height = align_up(self.tot_height + pixel_space, grid) - pixel_space
+    def scaled(self, factor):
+        # copy with all sizes and positions divided by factor, for a smaller variant of the texture,
+        # positions and boxes are on the grid, a sprite size that is not is rounded up to the pixels it covers
+        result = imgRect(self.name, align_up(self.width, factor) // factor, align_up(self.height, factor) // factor, self.index)
+        result.pack_x = self.pack_x // factor
+        result.pack_y = self.pack_y // factor
+        result.page = self.page
+        result.trimmed = self.trimmed
+        result.trim_x = self.trim_x // factor
+        result.trim_y = self.trim_y // factor
+        result.src_width = align_up(self.src_width, factor) // factor
+        result.src_height = align_up(self.src_height, factor) // factor
+        result.aliases = [alias.scaled(factor) for alias in self.aliases]
+        result.rotated = self.rotated
+        result.can_rotate = self.can_rotate
+        result.ext_up = self.ext_up // factor
+        result.ext_down = self.ext_down // factor
+        result.ext_left = self.ext_left // factor
+        result.ext_right = self.ext_right // factor
+        result.tot_width = self.tot_width // factor
+        result.tot_height = self.tot_height // factor
+        return result
+    def rotate(self):
+        # turn 90 degrees, or back again
+        self.rotated = not self.rotated
+        self.width, self.height = self.height, self.width
+        self.tot_width, self.tot_height = self.tot_height, self.tot_width
+    def frame_size(self):
+        # width and height of the sprite before rotating
+        if self.rotated:
+            return self.height, self.width
+        return self.width, self.height
+    def __cmp__(self, other):
+        return (self.height < other.height)
+    def __lt__(self, other):
+        return (self.height < other.height)
+
+def align_up(value, grid):
+    # smallest multiple of grid that is at least value
+    return (value + grid - 1) // grid * grid
+
+def align_rect(rect, grid, width, height):
+    # grow x, y, w, h outwards until the top-left is on multiples of grid, and the right and bottom
+    # as well unless that is past the width and height of the layer
+    x, y, w, h = rect
+    left = x - x % grid
+    top = y - y % grid
+    return left, top, min(align_up(x + w, grid), width) - left, min(align_up(y + h, grid), height) - top
+
+def scaled_layer_rects(layer_rects, factor):
+    # layout of a smaller variant, all sizes and positions have to be multiples of factor
+    return [obj.scaled(factor) for obj in layer_rects]
+
+# sort keys for the packing order, boxes are packed largest first
+sort_keys = {
+    "height": lambda r: r.height,
+    "width": lambda r: r.width,
+    "area": lambda r: r.tot_width * r.tot_height,
+    "perimeter": lambda r: r.tot_width + r.tot_height,
+    "maxside": lambda r: max(r.tot_width, r.tot_height),
+}
+
+def calc_start_width(layer_rects, pixel_space, factor=1.0):
+    # aim for a square-ish resulting container,
+    # slightly adjusted for sub-100% space utilization
+    area = 0
+    maxWidth = 0
+    for obj in layer_rects:
+        # calculate total layer area and maximum layer width
+        area += (obj.tot_width + pixel_space) * (obj.tot_height + pixel_space);
+        maxWidth = max(obj.tot_width + pixel_space, maxWidth)
+    return max(int(math.ceil(factor * math.sqrt(area / 0.95))), maxWidth)
+
+def prepare_layers_metadata(layers, layer_rects, spaces, pixel_space, trimrects=None, hashes=None, rotate=False, align=1, boxalign=1):
+    # Collect metadata from all layers as custom list,
+    # layers can be GIMP layers or any object with a name, width and height
+    # optional trimrects is the (x, y, w, h) to keep of each layer
+    # optional hashes is the pixel content hash of each layer, layers with the
+    # same content are only packed once and added as aliases of the first one
+    # optional rotate allows turning sprites, tall sprites start out turned on their side
+    # optional align is the grid for the extruded edges, the layer sizes, trimrects and padding
+    # have to be multiples of it as well so all sprites are packed on the grid
+    # optional boxalign is the grid for the packed boxes, so sprites don't share compression blocks
+    idx = 0
+    firsts = {}
+    for lyr in layers:
+        # layer image metadata
+        n = lyr.name
+        w = lyr.width
+        h = lyr.height
+        newrec = imgRect(n, w, h, idx)
+        if trimrects is not None:
+            newrec.set_trim(*trimrects[idx])
+        if align > 1:
+            newrec.align_edges(align)
+        if rotate and newrec.tot_width == newrec.width and newrec.tot_height == newrec.height:
+            # only sprites without extruded edges
+            newrec.can_rotate = True
+            if newrec.height > newrec.width:
+                newrec.rotate()
+        if boxalign > 1:
+            newrec.align_box(boxalign, pixel_space)
+        idx = idx + 1
+        if hashes is not None:
+            key = (hashes[newrec.index], newrec.ext_up, newrec.ext_down, newrec.ext_left, newrec.ext_right)
+            if key in firsts:
+                firsts[key].aliases.append(newrec)
+                continue
+            firsts[key] = newrec
+        layer_rects.append(newrec)
+
+    # sort the layer data for packing by height, descending
+    layer_rects.sort(reverse=True);
+
+    startWidth = calc_start_width(layer_rects, pixel_space)
+
+    # also initialise list of spaces, start with a single empty space based on average layer size
+    spaces.append(spaceobj(0, 0, startWidth, (startWidth+startWidth)))
+    return
+
+# free spaces indexed by their order in the spaces list,
+# a max-tree over width and height to find the last space that fits a box
+class spaceindex(object):
+    def __init__(self, spaces, capacity=64):
+        self.size = 1
+        while self.size < capacity:
+            self.size *= 2
+        self.slots = [None] * self.size
+        self.maxw = [-1] * (2 * self.size)
+        self.maxh = [-1] * (2 * self.size)
+        self.count = 0
+        for space in spaces:
+            self.append(space)
+
+    def update(self, slot):
+        # refresh the tree after the space in slot has been changed or removed
+        space = self.slots[slot]
+        maxw = self.maxw
+        maxh = self.maxh
+        n = self.size + slot
+        maxw[n] = space.width if space is not None else -1
+        maxh[n] = space.height if space is not None else -1
+        n >>= 1
+        while n >= 1:
+            w = max(maxw[2*n], maxw[2*n+1])
+            h = max(maxh[2*n], maxh[2*n+1])
+            if w == maxw[n] and h == maxh[n]:
+                break
+            maxw[n] = w
+            maxh[n] = h
+            n >>= 1
+
+    def append(self, space):
+        if self.count == self.size:
+            # full, drop removed slots and make room for as many new spaces
+            spaces = self.spaces()
+            self.__init__(spaces, 2 * len(spaces) + 64)
+        self.slots[self.count] = space
+        self.update(self.count)
+        self.count += 1
+
+    def remove(self, slot):
+        self.slots[slot] = None
+        self.update(slot)
+
+    def find(self, width, height):
+        # slot of the last space that can accommodate width x height, or -1
+        maxw = self.maxw
+        maxh = self.maxh
+        size = self.size
+        if maxw[1] < width or maxh[1] < height:
+            return -1
+        # most boxes fit one of the last added spaces, check those directly
+        slot = self.count - 1
+        while slot >= 0 and slot >= self.count - 16:
+            if maxw[size + slot] >= width and maxh[size + slot] >= height:
+                return slot
+            slot -= 1
+        # walk down preferring the right child, a node only tells that some
+        # space below is wide enough and some space is high enough so keep
+        # the left child in case the right subtree has no actual fit
+        stack = []
+        n = 1
+        while n < size:
+            left = 2*n
+            if maxw[left+1] >= width and maxh[left+1] >= height:
+                if maxw[left] >= width and maxh[left] >= height:
+                    stack.append(left)
+                n = left+1
+            elif maxw[left] >= width and maxh[left] >= height:
+                n = left
+            elif stack:
+                n = stack.pop()
+            else:
+                return -1
+        return n - size
+
+    def spaces(self):
+        # remaining spaces in list order
+        return [space for space in self.slots[:self.count] if space is not None]
+
+def pack_shelf(layer_rects, spaces, pixel_space):
+    # packing algorithm, explanation and code example by Volodymyr Agafonkin
+    # https://observablehq.com/@mourner/simple-rectangle-packing
+    index = spaceindex(spaces)
+    unplaced = 0
+    for box in layer_rects:
+
+        # look for the last added space that can accommodate the current box and its padding,
+        # same as looking through spaces backwards so that we check smaller spaces first
+        i = index.find(box.tot_width + pixel_space, box.tot_height + pixel_space)
+        if i < 0:
+            unplaced += 1
+            continue
+        space = index.slots[i]
+
+        # found the space; add the box to its top-left corner
+        # |-------|-------|
+        # |  box  |       |
+        # |_______|       |
+        # |         space |
+        # |_______________|
+        box.pack_x = space.x + box.ext_left
+        box.pack_y = space.y + box.ext_up
+
+        if (box.tot_width + pixel_space == space.width and box.tot_height + pixel_space == space.height):
+            # space matches the box exactly; remove it
+            index.remove(i)
+            continue
+
+        newspace = None
+        if (box.tot_height + pixel_space == space.height):
+            # space matches the box height; update it accordingly
+            # |-------|---------------|
+            # |  box  | updated space |
+            # |_______|_______________|
+            space.x += (box.tot_width + pixel_space);
+            space.width -= (box.tot_width + pixel_space);
+        elif (box.tot_width + pixel_space == space.width):
+            # space matches the box width; update it accordingly
+            # |---------------|
+            # |      box      |
+            # |_______________|
+            # | updated space |
+            # |_______________|
+            space.y += (box.tot_height + pixel_space);
+            space.height -= (box.tot_height + pixel_space);
+        else:
+            # otherwise the box splits the space into two spaces
+            # |-------|-----------|
+            # |  box  | new space |
+            # |_______|___________|
+            # | updated space     |
+            # |___________________|
+            newspace = spaceobj(space.x + box.tot_width + pixel_space, space.y, space.width - box.tot_width - pixel_space, box.tot_height + pixel_space);
+            space.y += (box.tot_height + pixel_space);
+            space.height -= (box.tot_height + pixel_space);
+        index.update(i)
+
+        # add new space after updating the index, appending can renumber the slots
+        if newspace is not None:
+            index.append(newspace)
+
+    # write back the remaining free spaces
+    spaces[:] = index.spaces()
+    return unplaced
+
+def pack_maxrects(layer_rects, spaces, pixel_space, heuristic):
+    # MaxRects packing algorithm, explanation and code by Jukka Jylanki
+    # https://github.com/juj/RectangleBinPack/blob/master/RectangleBinPack.pdf
+    # keeps a list of all maximal free rectangles, these can overlap each other
+    freerects = [(sp.x, sp.y, sp.width, sp.height) for sp in spaces]
+    used_h = 0
+    unplaced = 0
+    for box in layer_rects:
+        bw = box.tot_width + pixel_space
+        bh = box.tot_height + pixel_space
+        # width, height and turn the box
+        orientations = [(bw, bh, False)]
+        if box.can_rotate and bw != bh:
+            orientations.append((bh, bw, True))
+
+        # find the free rectangle with the best score, lowest wins,
+        # first avoid making the atlas taller because the spaces are twice as high as needed
+        best = None
+        bestscore = None
+        for fr in freerects:
+            for ow, oh, turn in orientations:
+                if ow > fr[2] or oh > fr[3]:
+                    continue
+                leftw = fr[2] - ow
+                lefth = fr[3] - oh
+                grow = max(0, fr[1] + oh - used_h)
+                if heuristic == "bssf": # best short side fit
+                    score = (grow, min(leftw, lefth), max(leftw, lefth), fr[1], fr[0], turn)
+                else: # "baf", best area fit
+                    score = (grow, fr[2] * fr[3] - ow * oh, min(leftw, lefth), fr[1], fr[0], turn)
+                if bestscore is None or score < bestscore:
+                    best = fr
+                    bestscore = score
+        if best is None:
+            unplaced += 1
+            continue
+        if bestscore[-1]:
+            box.rotate()
+            bw, bh = bh, bw
+
+        # add the box to the top-left corner of the free rectangle
+        px = best[0]
+        py = best[1]
+        box.pack_x = px + box.ext_left
+        box.pack_y = py + box.ext_up
+        used_h = max(used_h, py + bh)
+
+        # split all free rectangles that overlap the box into the parts around it
+        keep = []
+        newrects = []
+        for fr in freerects:
+            fx, fy, fw, fh = fr
+            if px >= fx + fw or px + bw <= fx or py >= fy + fh or py + bh <= fy:
+                keep.append(fr)
+                continue
+            if px > fx: # left part
+                newrects.append((fx, fy, px - fx, fh))
+            if px + bw < fx + fw: # right part
+                newrects.append((px + bw, fy, fx + fw - px - bw, fh))
+            if py > fy: # top part
+                newrects.append((fx, fy, fw, py - fy))
+            if py + bh < fy + fh: # bottom part
+                newrects.append((fx, py + bh, fw, fy + fh - py - bh))
+
+        # remove new rectangles that are inside another free rectangle,
+        # the kept rectangles are never inside a new one because they were already maximal
+        pruned = []
+        for i, nr in enumerate(newrects):
+            nx, ny, nw, nh = nr
+            contained = False
+            for j, fr in enumerate(newrects):
+                if i != j and fr[0] <= nx and fr[1] <= ny and fr[0] + fr[2] >= nx + nw and fr[1] + fr[3] >= ny + nh:
+                    # identical rectangles, keep only the first one
+                    if fr != nr or j < i:
+                        contained = True
+                        break
+            if not contained:
+                for fr in keep:
+                    if fr[0] <= nx and fr[1] <= ny and fr[0] + fr[2] >= nx + nw and fr[1] + fr[3] >= ny + nh:
+                        contained = True
+                        break
+            if not contained:
+                pruned.append(nr)
+        freerects = keep + pruned
+
+    # remaining free spaces
+    spaces[:] = [spaceobj(fx, fy, fw, fh) for fx, fy, fw, fh in freerects]
+    return unplaced
+
+def pack_maxrects_bssf(layer_rects, spaces, pixel_space):
+    return pack_maxrects(layer_rects, spaces, pixel_space, "bssf")
+
+def pack_maxrects_baf(layer_rects, spaces, pixel_space):
+    return pack_maxrects(layer_rects, spaces, pixel_space, "baf")
+
+def pack_skyline(layer_rects, spaces, pixel_space):
+    # skyline bottom-left packing algorithm, see Jukka Jylanki's paper as for MaxRects
+    # the skyline is a list of [x, y, width] segments from left to right,
+    # everything below the skyline is considered used (y goes down in the image)
+    # only uses the first space
+    bin = spaces[0]
+    skyline = [[bin.x, bin.y, bin.width]]
+    unplaced = 0
+    for box in layer_rects:
+        bw = box.tot_width + pixel_space
+        bh = box.tot_height + pixel_space
+        # width, height and turn the box
+        orientations = [(bw, bh, False)]
+        if box.can_rotate and bw != bh:
+            orientations.append((bh, bw, True))
+
+        # find the position where the box top ends up the lowest, then leftmost
+        best = -1
+        bestscore = None
+        for ow, oh, turn in orientations:
+            for i in range(len(skyline)):
+                x = skyline[i][0]
+                if x + ow > bin.x + bin.width:
+                    break
+                # box rests on the highest segment it spans
+                y = 0
+                spanw = 0
+                j = i
+                while spanw < ow:
+                    y = max(y, skyline[j][1])
+                    spanw += skyline[j][2]
+                    j += 1
+                if y + oh > bin.y + bin.height:
+                    continue
+                score = (y + oh, x, turn)
+                if bestscore is None or score < bestscore:
+                    best = i
+                    bestscore = score
+        if best < 0:
+            unplaced += 1
+            continue
+        if bestscore[-1]:
+            box.rotate()
+            bw, bh = bh, bw
+
+        px = skyline[best][0]
+        py = bestscore[0] - bh
+        box.pack_x = px + box.ext_left
+        box.pack_y = py + box.ext_up
+
+        # raise the skyline under the box, shrink or drop the segments it covers
+        skyline.insert(best, [px, py + bh, bw])
+        i = best + 1
+        while i < len(skyline):
+            seg = skyline[i]
+            if seg[0] >= px + bw:
+                break
+            cut = px + bw - seg[0]
+            if cut >= seg[2]:
+                del skyline[i]
+            else:
+                seg[0] += cut
+                seg[2] -= cut
+                break
+
+        # merge neighbouring segments with the same height
+        i = 0
+        while i < len(skyline) - 1:
+            if skyline[i][1] == skyline[i+1][1]:
+                skyline[i][2] += skyline[i+1][2]
+                del skyline[i+1]
+            else:
+                i += 1
+
+    # remaining free spaces are above the skyline
+    spaces[:] = [spaceobj(x, y, w, bin.y + bin.height - y) for x, y, w in skyline if y < bin.y + bin.height]
+    return unplaced
+
+# available packing algorithms, in the order of the plug-in dialog
+packing_engine_names = ("shelf", "maxrects-bssf", "maxrects-baf", "skyline")
+packing_engines = {
+    "shelf": pack_shelf,
+    "maxrects-bssf": pack_maxrects_bssf,
+    "maxrects-baf": pack_maxrects_baf,
+    "skyline": pack_skyline,
+}
+
+def calc_layers_packing(layer_rects, spaces, pixel_space, engine="shelf"):
+    # pack all boxes into the free spaces with the selected packing algorithm,
+    # afterwards spaces contains the remaining free spaces
+    # returns the number of boxes that did not fit
+    if engine not in packing_engines:
+        raise ValueError('unknown packing engine "%s"' % engine)
+    return packing_engines[engine](layer_rects, spaces, pixel_space)
+
+def calc_layers_pages(layer_rects, spaces, pixel_space, maxsize, engine="shelf", factor=1.0):
+    # pack all boxes on as many pages of at most maxsize x maxsize as needed,
+    # each page is filled before starting the next one with the boxes that did not fit
+    # afterwards spaces contains the remaining free spaces of all pages
+    # returns the number of pages
+    del spaces[:]
+    remaining = layer_rects
+    page = 0
+    while remaining:
+        # the padding after the last column and row is not part of the texture,
+        # the page is at least as tall as the tallest box so a long thin sprite still fits
+        startWidth = min(calc_start_width(remaining, pixel_space, factor), maxsize + pixel_space)
+        maxHeight = max([obj.tot_height + pixel_space for obj in remaining])
+        pagespaces = [spaceobj(0, 0, startWidth, min(max(startWidth+startWidth, maxHeight), maxsize + pixel_space))]
+        # pack_x -1 marks boxes that are not placed on this page
+        for obj in remaining:
+            obj.pack_x = -1
+        calc_layers_packing(remaining, pagespaces, pixel_space, engine)
+        placed = [obj for obj in remaining if obj.pack_x >= 0]
+        if not placed:
+            raise ValueError('sprite "%s" is larger than the maximum texture size %d' % (remaining[0].name, maxsize))
+        for obj in placed:
+            obj.page = page
+        for space in pagespaces:
+            space.page = page
+        spaces.extend(pagespaces)
+        remaining = [obj for obj in remaining if obj.pack_x < 0]
+        page += 1
+    return page
+
+def page_count(layer_rects):
+    return max([obj.page for obj in layer_rects] + [0]) + 1
+
+def page_rects(layer_rects, page):
+    # sprites on one page, in packing order
+    return [obj for obj in layer_rects if obj.page == page]
+
+def page_spaces(spaces, page):
+    return [space for space in spaces if space.page == page]
+
+def calc_atlas_size(layer_rects):
+    # determine total width, height of the packed sprites, including extruded edges
+    img_w = 0
+    img_h = 0
+    for obj in layer_rects:
+        w = obj.pack_x + obj.width + obj.ext_right
+        h = obj.pack_y + obj.height + obj.ext_down
+        if w > img_w:
+            img_w = w
+        if h > img_h:
+            img_h = h
+    return img_w, img_h
+
+# texture size policies, in the order of the plug-in dialog
+size_policy_names = ("exact", "multiple-4", "multiple-8", "pow2", "square-pow2")
+
+def next_pow2(value):
+    size = 1
+    while size < value:
+        size *= 2
+    return size
+
+def calc_policy_size(img_w, img_h, policy="exact"):
+    # final texture size for the packed width and height, texture compression
+    # needs multiples of the block size and older GPUs need powers of two for mipmaps
+    if policy == "multiple-4":
+        return align_up(img_w, 4), align_up(img_h, 4)
+    if policy == "multiple-8":
+        return align_up(img_w, 8), align_up(img_h, 8)
+    if policy == "pow2":
+        return next_pow2(img_w), next_pow2(img_h)
+    if policy == "square-pow2":
+        size = next_pow2(max(img_w, img_h))
+        return size, size
+    if policy != "exact":
+        raise ValueError('unknown size policy "%s"' % policy)
+    return img_w, img_h
+
+def calc_policy_max_size(maxsize, policy="exact"):
+    # largest texture size that is not more than maxsize after applying the policy, 0 is no limit
+    if maxsize <= 0:
+        return maxsize
+    if policy in ("pow2", "square-pow2"):
+        return next_pow2(maxsize + 1) // 2
+    if policy == "multiple-4":
+        return maxsize - maxsize % 4
+    if policy == "multiple-8":
+        return maxsize - maxsize % 8
+    return maxsize
+
+# small watermark, one byte per column of 7 pixels
+pixelwm = [7, 5, 6, 0, 7, 0, 55, 65, 50, 1, 119, 80, 119, 3, 64, 0, 84, 119, 97, 0, 7, 3, 112, 119, 97, 0, 103, 112, 1, 119, 49, 96, 7, 7, 21, 112, 70, 3, 118, 81, 119, 1, 16, 119, 68, 0, 54, 35, 118, 0, 4, 7, 1]
+
+# packed sprites by grid cell, to find out quickly if a rectangle of the texture is empty
+class occupancyIndex(object):
+    def __init__(self, layer_rects, cell=64):
+        self.cell = cell
+        self.cells = {}
+        for obj in layer_rects:
+            # area taken in the texture including the extruded edges
+            box = (obj.pack_x - obj.ext_left, obj.pack_y - obj.ext_up, obj.tot_width, obj.tot_height)
+            if box[2] > 0 and box[3] > 0:
+                for key in self.cell_keys(*box):
+                    self.cells.setdefault(key, []).append(box)
+
+    def cell_keys(self, x, y, w, h):
+        c = self.cell
+        return [(cx, cy) for cy in range(y // c, (y + h - 1) // c + 1) for cx in range(x // c, (x + w - 1) // c + 1)]
+
+    def is_free(self, x, y, w, h):
+        # True when no sprite overlaps the rectangle
+        for key in self.cell_keys(x, y, w, h):
+            for bx, by, bw, bh in self.cells.get(key, []):
+                if bx < x + w and x < bx + bw and by < y + h and y < by + bh:
+                    return False
+        return True
+
+    def boxes(self):
+        # all sprite boxes, each one once
+        return set([box for boxes in self.cells.values() for box in boxes])
+
+def watermark_box(xmark, ymark, horzmark):
+    # x, y, w, h of the watermark pixels, the vertical watermark starts 2 pixels right of xmark
+    if horzmark:
+        return xmark, ymark, len(pixelwm), 7
+    return xmark + 2, ymark, 7, len(pixelwm)
+
+def find_watermark_spot(spaces, img_w, img_h, layer_rects=None):
+    # look for the smallest leftover space where the watermark fits,
+    # with the sprites of the page each spot is checked to be really empty, and when no space fits
+    # the spots right of and below each sprite are tried, outside the image when there is no spot at all
+    # the spaces are left unchanged, they are also stored for the next export
+    index = occupancyIndex(layer_rects) if layer_rects is not None else None
+
+    def is_empty(xmark, ymark, horzmark):
+        x, y, w, h = watermark_box(xmark, ymark, horzmark)
+        if x < 0 or y < 0 or x + w > img_w or y + h > img_h:
+            return False
+        return index is None or index.is_free(x, y, w, h)
+
+    for sp in sorted(spaces): # sort smallest first
+        # adjust space for out-of-bounds of final image size
+        width = min(sp.width, img_w - sp.x)
+        height = min(sp.height, img_h - sp.y)
+        # check if watermark fits inside space
+        if width >= 54 and height >= 8 and is_empty(sp.x, sp.y, True):
+            return sp.x, sp.y, True
+        if width >= 9 and height >= 54 and is_empty(sp.x, sp.y, False):
+            return sp.x, sp.y, False
+
+    if index is not None:
+        # one pixel right of or below a sprite, top to bottom
+        spots = [(0, 0)]
+        for bx, by, bw, bh in index.boxes():
+            spots.append((bx + bw + 1, by))
+            spots.append((bx, by + bh + 1))
+        for xmark, ymark in sorted(spots, key=lambda spot: (spot[1], spot[0])):
+            if is_empty(xmark, ymark, True):
+                return xmark, ymark, True
+            if is_empty(xmark - 2, ymark, False):
+                return xmark - 2, ymark, False
+    return img_w, img_h, True
+
+def watermark_pixels(xmark, ymark, horzmark, img_w, img_h):
+    # list of all watermark pixel coordinates that are inside the image
+    result = []
+    for wm in pixelwm:
+        for b in range(0, 7):
+            if wm & (1 << b): # bitwise-and
+                xplot = xmark if horzmark else xmark+8-b
+                yplot = ymark+b if horzmark else ymark
+                if (xplot < img_w and yplot < img_h):
+                    result.append((xplot, yplot))
+        if horzmark:
+            xmark += 1
+        else:
+            ymark += 1
+    return result
@@ -0,0 +1,208 @@
+# GIMP SpriteAtlas png reader/writer
+# Minimal PNG codec using only zlib, decodes to and encodes from 8-bit RGBA
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import struct
+import zlib
+
+from .render import rgba_from_bytes
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# channels per pixel for each PNG color type
+png_channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+def read_chunks(f):
+    # yield (type, data) of all chunks in a png file
+    if f.read(8) != PNG_SIGNATURE:
+        raise ValueError('not a PNG file')
+    while True:
+        hdr = f.read(8)
+        if len(hdr) < 8:
+            return
+        length, ctype = struct.unpack('>I4s', hdr)
+        data = f.read(length)
+        f.read(4) # crc
+        yield ctype, data
+        if ctype == b'IEND':
+            return
+
+def unfilter_scanlines(raw, height, stride, bpp):
+    # undo the per-scanline filters, see PNG specification section 9
+    result = bytearray(height * stride)
+    prev = bytearray(stride)
+    pos = 0
+    for y in range(height):
+        ftype = raw[pos]
+        line = bytearray(raw[pos+1:pos+1+stride])
+        pos += stride + 1
+        if ftype == 1: # sub
+            for i in range(bpp, stride):
+                line[i] = (line[i] + line[i-bpp]) & 0xff
+        elif ftype == 2: # up
+            for i in range(stride):
+                line[i] = (line[i] + prev[i]) & 0xff
+        elif ftype == 3: # average
+            for i in range(stride):
+                left = line[i-bpp] if i >= bpp else 0
+                line[i] = (line[i] + ((left + prev[i]) >> 1)) & 0xff
+        elif ftype == 4: # paeth
+            for i in range(stride):
+                a = line[i-bpp] if i >= bpp else 0
+                b = prev[i]
+                c = prev[i-bpp] if i >= bpp else 0
+                p = a + b - c
+                pa = abs(p - a)
+                pb = abs(p - b)
+                pc = abs(p - c)
+                if pa <= pb and pa <= pc:
+                    pr = a
+                elif pb <= pc:
+                    pr = b
+                else:
+                    pr = c
+                line[i] = (line[i] + pr) & 0xff
+        elif ftype != 0:
+            raise ValueError('invalid PNG filter type %d' % ftype)
+        result[y*stride:(y+1)*stride] = line
+        prev = line
+    return result
+
+def read_png(filename):
+    # decode a png file, returns width, height and RGBA pixels as bytearray
+    idat = []
+    palette = None
+    trns = None
+    with open(filename, 'rb') as f:
+        for ctype, data in read_chunks(f):
+            if ctype == b'IHDR':
+                width, height, depth, ctype_, _, _, interlace = struct.unpack('>IIBBBBB', data)
+            elif ctype == b'PLTE':
+                palette = bytearray(data)
+            elif ctype == b'tRNS':
+                trns = bytearray(data)
+            elif ctype == b'IDAT':
+                idat.append(data)
+    if interlace != 0:
+        raise ValueError('%s: interlaced PNG files are not supported' % filename)
+    if ctype_ not in png_channels:
+        raise ValueError('%s: unsupported PNG color type %d' % (filename, ctype_))
+
+    channels = png_channels[ctype_]
+    bits = channels * depth
+    stride = (width * bits + 7) // 8
+    bpp = max(1, bits // 8)
+    raw = bytearray(zlib.decompress(b''.join(idat)))
+    pix = unfilter_scanlines(raw, height, stride, bpp)
+
+    # convert to samples of 8 bits
+    if depth == 16:
+        pix = pix[0::2]
+    elif depth < 8:
+        samples = bytearray()
+        mask = (1 << depth) - 1
+        scale = 255 // mask if ctype_ != 3 else 1
+        for y in range(height):
+            line = pix[y*stride:(y+1)*stride]
+            row = bytearray(width)
+            for x in range(width):
+                bitpos = x * depth
+                v = (line[bitpos >> 3] >> (8 - depth - (bitpos & 7))) & mask
+                row[x] = v * scale
+            samples += row
+        pix = samples
+    elif stride != width * channels:
+        pix = pix[:height*width*channels]
+
+    # expand to RGBA
+    count = width * height
+    if ctype_ != 3:
+        rgba = rgba_from_bytes(pix, channels)
+    if ctype_ == 2:
+        if trns is not None and len(trns) >= 6:
+            hi = 0 if depth == 16 else 1
+            key = (trns[hi], trns[hi+2], trns[hi+4])
+            for i in range(count):
+                if (pix[i*3], pix[i*3+1], pix[i*3+2]) == key:
+                    rgba[i*4+3] = 0
+    elif ctype_ == 0:
+        if trns is not None and len(trns) >= 2:
+            if depth == 16:
+                key = trns[0]
+            else:
+                key = trns[1] * (255 // ((1 << depth) - 1))
+            for i in range(count):
+                if pix[i] == key:
+                    rgba[i*4+3] = 0
+    elif ctype_ == 3: # palette
+        alpha = bytearray(b'\xff' * 256)
+        if trns is not None:
+            alpha[:len(trns)] = trns
+        lut = []
+        for i in range(256):
+            if palette is not None and i*3+2 < len(palette):
+                lut.append(bytes(palette[i*3:i*3+3] + alpha[i:i+1]))
+            else:
+                lut.append(bytes(bytearray([0, 0, 0, alpha[i]])))
+        rgba = bytearray(b''.join([lut[v] for v in pix]))
+    return width, height, rgba
+
+def write_chunk(f, ctype, data):
+    f.write(struct.pack('>I', len(data)))
+    f.write(ctype)
+    f.write(data)
+    f.write(struct.pack('>I', zlib.crc32(ctype + data) & 0xffffffff))
+
+def write_png(filename, width, height, rgba):
+    # encode RGBA pixels as 8-bit truecolor+alpha png file
+    stride = width * 4
+    raw = bytearray()
+    for y in range(height):
+        raw += b'\x00' # filter type none
+        raw += rgba[y*stride:(y+1)*stride]
+    with open(filename, 'wb') as f:
+        f.write(PNG_SIGNATURE)
+        write_chunk(f, b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+        write_chunk(f, b'IDAT', zlib.compress(bytes(raw), 6))
+        write_chunk(f, b'IEND', b'')
+
+# png file written a few rows at a time, so the whole image never has to be in memory,
+# rows that are missing at close are transparent
+class pngWriter(object):
+    def __init__(self, filename, width, height, level=6):
+        self.width = width
+        self.height = height
+        self.rows = 0
+        self.compressor = zlib.compressobj(level)
+        self.file = open(filename, 'wb')
+        self.file.write(PNG_SIGNATURE)
+        write_chunk(self.file, b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+
+    def write_rows(self, buf):
+        # append the rows of a pixel buffer, a narrower buffer is padded with transparent pixels
+        stride = buf.width * 4
+        empty = b'\x00' * ((self.width - buf.width) * 4)
+        rows = min(buf.height, self.height - self.rows)
+        raw = bytearray()
+        for y in range(rows):
+            raw += b'\x00' # filter type none
+            raw += buf.data[y*stride:(y+1)*stride]
+            raw += empty
+        self.write_data(raw)
+        self.rows += rows
+
+    def write_data(self, raw):
+        data = self.compressor.compress(bytes(raw))
+        if data:
+            write_chunk(self.file, b'IDAT', data)
+
+    def close(self):
+        empty = b'\x00' * (self.width * 4 + 1)
+        while self.rows < self.height:
+            rows = min(256, self.height - self.rows)
+            self.write_data(empty * rows)
+            self.rows += rows
+        write_chunk(self.file, b'IDAT', self.compressor.flush())
+        write_chunk(self.file, b'IEND', b'')
+        self.file.close()
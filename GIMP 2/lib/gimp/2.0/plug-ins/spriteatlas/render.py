@@ -0,0 +1,285 @@
+# GIMP SpriteAtlas render core
+# Compose packed sprites into a single RGBA pixel buffer, no GIMP dependencies
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import hashlib
+import operator
+
+from .packing import align_rect, find_watermark_spot, watermark_box, watermark_pixels
+from .stats import stats_timer
+
+# RGBA pixel data of one image, rows top to bottom
+class imgBuffer(object):
+    def __init__(self, width, height, data=None, name=''):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.data = data if data is not None else bytearray(width * height * 4)
+
+    def blit(self, src, x, y, sx=0, sy=0, w=None, h=None):
+        # copy a rectangle of src to position x,y, one row slice at a time
+        w = src.width if w is None else w
+        h = src.height if h is None else h
+        for row in range(h):
+            dst_pos = ((y + row) * self.width + x) * 4
+            src_pos = ((sy + row) * src.width + sx) * 4
+            self.data[dst_pos:dst_pos + w*4] = src.data[src_pos:src_pos + w*4]
+
+    def crop(self, x, y, w, h):
+        result = imgBuffer(w, h, name=self.name)
+        result.blit(self, 0, 0, x, y, w, h)
+        return result
+
+    def padded(self, w, h):
+        # same image on a larger transparent canvas, anchored top-left
+        if w == self.width and h == self.height:
+            return self
+        result = imgBuffer(w, h, name=self.name)
+        result.blit(self, 0, 0)
+        return result
+
+    def downscaled(self, factor):
+        # smaller copy, each factor x factor block becomes one pixel,
+        # colors are weighted by alpha so transparent pixels don't darken the edges
+        w = self.width // factor
+        h = self.height // factor
+        result = imgBuffer(w, h, name=self.name)
+        count = factor * factor
+        stride = self.width * 4
+        for y in range(h):
+            rows = [self.data[(y*factor + dy) * stride:(y*factor + dy + 1) * stride] for dy in range(factor)]
+            # per channel, the samples of one position in the blocks for the whole output row
+            alphas = [row[dx*4 + 3::factor*4][:w] for row in rows for dx in range(factor)]
+            alphasum = [sum(block) for block in zip(*alphas)]
+            pos = y * w * 4
+            for c in range(3):
+                colors = [row[dx*4 + c::factor*4][:w] for row in rows for dx in range(factor)]
+                weighted = [list(map(operator.mul, color, alpha)) for color, alpha in zip(colors, alphas)]
+                colorsum = [sum(block) for block in zip(*weighted)]
+                result.data[pos + c:pos + w*4:4] = bytearray([(cs + a // 2) // a if a else 0 for cs, a in zip(colorsum, alphasum)])
+            result.data[pos + 3:pos + w*4:4] = bytearray([(a + count // 2) // count for a in alphasum])
+        return result
+
+    def rotated(self, clockwise=True):
+        # new buffer turned 90 degrees, each output row is an input column
+        # taken from the channel planes with slices, so no loop per pixel
+        w = self.width
+        h = self.height
+        result = imgBuffer(h, w, name=self.name)
+        for c in range(4):
+            plane = self.data[c::4]
+            if clockwise:
+                rows = [plane[col::w][::-1] for col in range(w)]
+            else:
+                rows = [plane[col::w] for col in range(w-1, -1, -1)]
+            result.data[c::4] = b''.join([bytes(row) for row in rows])
+        return result
+
+    def clear(self, x, y, w, h):
+        # make a rectangle fully transparent
+        empty = bytearray(w * 4)
+        for row in range(y, y + h):
+            pos = (row * self.width + x) * 4
+            self.data[pos:pos + w*4] = empty
+
+    def set_pixel(self, x, y, rgba):
+        pos = (y * self.width + x) * 4
+        self.data[pos:pos+4] = bytearray(rgba)
+
+def rgba_from_bytes(data, bpp):
+    # convert 8-bit gray, gray+alpha or RGB pixel data to RGBA
+    if bpp == 4:
+        return data
+    count = len(data) // bpp
+    rgba = bytearray(count * 4)
+    if bpp == 3: # RGB
+        for c in range(3):
+            rgba[c::4] = data[c::3]
+        rgba[3::4] = b'\xff' * count
+    elif bpp == 2: # gray + alpha
+        for c in range(3):
+            rgba[c::4] = data[0::2]
+        rgba[3::4] = data[1::2]
+    else: # gray
+        for c in range(3):
+            rgba[c::4] = data
+        rgba[3::4] = b'\xff' * count
+    return rgba
+
+def calc_trim_rect(buf):
+    # bounding box x, y, w, h of all pixels that are not fully transparent,
+    # scans whole rows of the alpha channel at once
+    w = buf.width
+    alpha = bytes(buf.data[3::4])
+    empty = b'\x00' * w
+    rows = [alpha[y*w:(y+1)*w] for y in range(buf.height)]
+    used = [y for y in range(buf.height) if rows[y] != empty]
+    if not used:
+        # fully transparent, keep one pixel
+        return 0, 0, 1, 1
+    top = used[0]
+    bottom = used[-1] + 1
+    left = w
+    right = 0
+    for y in used:
+        left = min(left, w - len(rows[y].lstrip(b'\x00')))
+        right = max(right, len(rows[y].rstrip(b'\x00')))
+    return left, top, right - left, bottom - top
+
+def calc_pixel_hash(buf, rect=None):
+    # content hash of the pixels in rect x, y, w, h, default the whole buffer
+    x, y, w, h = rect if rect is not None else (0, 0, buf.width, buf.height)
+    hsh = hashlib.sha1(('%d,%d;' % (w, h)).encode('ascii'))
+    for row in range(y, y + h):
+        pos = (row * buf.width + x) * 4
+        hsh.update(bytes(buf.data[pos:pos + w*4]))
+    return hsh.hexdigest()
+
+def calc_sprite_info(buf, trim=False, align=1, hashing=False):
+    # trim rectangle on the align grid and pixel hash of one sprite, None when not needed,
+    # also used by worker processes that only send these back instead of the pixels
+    trimrect = align_rect(calc_trim_rect(buf), align, buf.width, buf.height) if trim else None
+    hsh = calc_pixel_hash(buf, trimrect) if hashing else None
+    return trimrect, hsh
+
+def extrude_edges_buffer(atlas, obj, left=0, top=0):
+    # repeat the outer columns and then the outer rows of a placed sprite outwards,
+    # the rows include the extruded columns so the corners are filled as well,
+    # left, top is the position of the buffer in the atlas
+    data = atlas.data
+    stride = atlas.width * 4
+    pack_x = obj.pack_x - left
+    pack_y = obj.pack_y - top
+    if obj.ext_left > 0 or obj.ext_right > 0:
+        for row in range(pack_y, pack_y + obj.height):
+            pos = row * stride + pack_x * 4
+            end = pos + obj.width * 4
+            if obj.ext_left > 0: # left
+                data[pos - obj.ext_left*4:pos] = data[pos:pos+4] * obj.ext_left
+            if obj.ext_right > 0: # right
+                data[end:end + obj.ext_right*4] = data[end-4:end] * obj.ext_right
+    x = (pack_x - obj.ext_left) * 4
+    rowlen = (obj.width + obj.ext_left + obj.ext_right) * 4
+    if obj.ext_up > 0: # up
+        pos = pack_y * stride + x
+        edge = data[pos:pos + rowlen]
+        for k in range(1, obj.ext_up + 1):
+            data[pos - k*stride:pos - k*stride + rowlen] = edge
+    if obj.ext_down > 0: # down
+        pos = (pack_y + obj.height - 1) * stride + x
+        edge = data[pos:pos + rowlen]
+        for k in range(1, obj.ext_down + 1):
+            data[pos + k*stride:pos + k*stride + rowlen] = edge
+
+def draw_sprite(atlas, obj, buffers, clockwise=True, left=0, top=0, stats=None):
+    # rotated sprites are turned clockwise (TexturePacker) or counter clockwise (libGDX),
+    # stats is the atlasStats that gets the time of the extruding
+    if obj.rotated:
+        w, h = obj.frame_size()
+        sprite = buffers[obj.index].crop(obj.trim_x, obj.trim_y, w, h).rotated(clockwise)
+        atlas.blit(sprite, obj.pack_x - left, obj.pack_y - top)
+    else:
+        atlas.blit(buffers[obj.index], obj.pack_x - left, obj.pack_y - top, obj.trim_x, obj.trim_y, obj.width, obj.height)
+    with stats_timer(stats, "extrude"):
+        extrude_edges_buffer(atlas, obj, left, top)
+
+def draw_sprite_box(obj, buffers, clockwise=True, stats=None):
+    # a placed sprite with its extruded edges in a buffer of its own
+    left = obj.pack_x - obj.ext_left
+    top = obj.pack_y - obj.ext_up
+    box = imgBuffer(obj.width + obj.ext_left + obj.ext_right, obj.height + obj.ext_up + obj.ext_down)
+    draw_sprite(box, obj, buffers, clockwise, left, top, stats)
+    return box
+
+def watermark_buffer(horzmark=True):
+    # the watermark pixels as a small image, white on transparent
+    x, y, w, h = watermark_box(0, 0, horzmark)
+    result = imgBuffer(w, h)
+    for xplot, yplot in watermark_pixels(0, 0, horzmark, x + w, y + h):
+        result.set_pixel(xplot - x, yplot - y, [255, 255, 255, 255])
+    return result
+
+def find_watermark(spaces, layer_rects, img_w, img_h):
+    # position and pixels of the watermark in an empty spot of the texture, None when there is no room
+    xmark, ymark, horzmark = find_watermark_spot(spaces, img_w, img_h, layer_rects)
+    x, y, w, h = watermark_box(xmark, ymark, horzmark)
+    if x + w > img_w or y + h > img_h:
+        return None
+    return x, y, watermark_buffer(horzmark)
+
+def draw_watermark(atlas, spaces, layer_rects, stats=None):
+    # the spot is empty, so the watermark is written as one rectangle
+    with stats_timer(stats, "watermark"):
+        mark = find_watermark(spaces, layer_rects, atlas.width, atlas.height)
+        if mark is not None:
+            x, y, glyph = mark
+            atlas.blit(glyph, x, y)
+
+def compose_spriteatlas(layer_rects, spaces, buffers, img_w, img_h, clockwise=True, stats=None):
+    # render output atlas based on current layer coordinates, buffers in same order as the layers
+    atlas = imgBuffer(img_w, img_h)
+    for obj in layer_rects:
+        draw_sprite(atlas, obj, buffers, clockwise, stats=stats)
+
+    # add small watermark
+    draw_watermark(atlas, spaces, layer_rects, stats)
+    return atlas
+
+def recompose_spriteatlas(previous, layer_rects, spaces, buffers, img_w, img_h, dirty, clockwise=True, stats=None):
+    # update the atlas of the previous export, only the dirty x, y, w, h rectangles
+    # are cleared and the sprites overlapping them are drawn again
+    atlas = imgBuffer(img_w, img_h)
+    atlas.blit(previous, 0, 0, 0, 0, min(previous.width, img_w), min(previous.height, img_h))
+    regions = []
+    for x, y, w, h in dirty:
+        # padding and watermark can be partly outside the image
+        w = min(x + w, img_w) - x
+        h = min(y + h, img_h) - y
+        if w > 0 and h > 0:
+            atlas.clear(x, y, w, h)
+            regions.append((x, y, w, h))
+    for obj in layer_rects:
+        x = obj.pack_x - obj.ext_left
+        y = obj.pack_y - obj.ext_up
+        for dx, dy, dw, dh in regions:
+            if x < dx + dw and dx < x + obj.tot_width and y < dy + dh and dy < y + obj.tot_height:
+                draw_sprite(atlas, obj, buffers, clockwise, stats=stats)
+                break
+
+    # add small watermark
+    draw_watermark(atlas, spaces, layer_rects, stats)
+    return atlas
+
+def compose_spriteatlas_strips(layer_rects, spaces, buffers, img_w, img_h, strip_height, clockwise=True, stats=None):
+    # same atlas as compose_spriteatlas, but yields it in horizontal strips of strip_height rows, top to bottom,
+    # the sprites are drawn when the first strip reaches them and dropped after their last row,
+    # so only one strip and the sprites crossing it are in memory
+    order = sorted(layer_rects, key=lambda obj: obj.pack_y - obj.ext_up)
+    with stats_timer(stats, "watermark"):
+        mark = find_watermark(spaces, layer_rects, img_w, img_h)
+    active = []
+    idx = 0
+    for y in range(0, img_h, strip_height):
+        h = min(strip_height, img_h - y)
+        strip = imgBuffer(img_w, h)
+        while idx < len(order) and order[idx].pack_y - order[idx].ext_up < y + h:
+            active.append((order[idx], draw_sprite_box(order[idx], buffers, clockwise, stats)))
+            idx += 1
+        remaining = []
+        for obj, box in active:
+            top = obj.pack_y - obj.ext_up
+            first = max(y, top)
+            last = min(y + h, top + box.height)
+            strip.blit(box, obj.pack_x - obj.ext_left, first - y, 0, first - top, box.width, last - first)
+            if top + box.height > y + h:
+                remaining.append((obj, box))
+        active = remaining
+
+        # small watermark, the rows in this strip
+        if mark is not None:
+            xmark, ymark, glyph = mark
+            first = max(y, ymark)
+            last = min(y + h, ymark + glyph.height)
+            strip.blit(glyph, xmark, first - y, 0, first - ymark, glyph.width, last - first)
+        yield strip
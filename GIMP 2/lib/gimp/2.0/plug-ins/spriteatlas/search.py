@@ -0,0 +1,134 @@
+# GIMP SpriteAtlas packing search
+# Try combinations of sort order, start width and packing algorithm
+# and keep the layout with the smallest atlas
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import copy
+import multiprocessing
+import time
+
+from .packing import (spaceobj, sort_keys, calc_start_width, calc_layers_packing,
+    calc_layers_pages, calc_atlas_size, page_rects, packing_engine_names, align_up, calc_policy_size)
+
+# start widths to try, relative to the default start width
+search_width_factors = (1.0, 0.9, 1.1, 0.8, 1.2, 0.95, 1.05, 0.85, 1.35, 1.5)
+
+# sprites, padding, maximum page size and texture size rounding of the search, set once per worker process,
+# only used in the worker processes so searches in several threads don't mix
+search_rects = None
+search_pixel_space = 1
+search_max_size = 0
+search_size_policy = "exact"
+search_align = 1
+
+def init_search_worker(layer_rects, pixel_space, maxsize=0, sizepolicy="exact", align=1):
+    global search_rects, search_pixel_space, search_max_size, search_size_policy, search_align
+    search_rects = layer_rects
+    search_pixel_space = pixel_space
+    search_max_size = maxsize
+    search_size_policy = sizepolicy
+    search_align = align
+
+def pack_candidate(candidate):
+    # worker process version of pack_layers_candidate
+    return pack_layers_candidate(search_rects, search_pixel_space, search_max_size, candidate,
+        search_size_policy, search_align)
+
+def pack_layers_candidate(layer_rects, pixel_space, maxsize, candidate, sizepolicy="exact", align=1):
+    # pack a copy of the sprites for one (sortkey, width factor, engine) combination,
+    # the texture sizes are rounded up to align and by the size policy, same as AtlasSession.page_size
+    # returns None when not all sprites fit
+    sortkey, factor, engine = candidate
+    rects = [copy.copy(obj) for obj in layer_rects]
+    rects.sort(key=sort_keys[sortkey], reverse=True)
+    spaces = []
+    if maxsize > 0:
+        try:
+            pages = calc_layers_pages(rects, spaces, pixel_space, maxsize, engine, factor)
+        except ValueError:
+            return None
+    else:
+        pages = 1
+        startWidth = calc_start_width(rects, pixel_space, factor)
+        spaces.append(spaceobj(0, 0, startWidth, (startWidth+startWidth)))
+        if calc_layers_packing(rects, spaces, pixel_space, engine) > 0:
+            return None
+    # fewest pages first, then the smallest total texture area
+    area = 0
+    maxside = 0
+    for page in range(pages):
+        img_w, img_h = calc_atlas_size(page_rects(rects, page))
+        img_w, img_h = calc_policy_size(align_up(img_w, align), align_up(img_h, align), sizepolicy)
+        area += img_w * img_h
+        maxside = max(maxside, img_w, img_h)
+    positions = [(obj.index, obj.pack_x, obj.pack_y, obj.rotated, obj.page) for obj in rects]
+    freespaces = [(sp.x, sp.y, sp.width, sp.height, sp.page) for sp in spaces]
+    return (pages, area, maxside), candidate, positions, freespaces
+
+def search_candidates(engines):
+    # all combinations, engines innermost so each engine is tried early on
+    result = []
+    for factor in search_width_factors:
+        for sortkey in ("height", "area", "maxside", "width", "perimeter"):
+            for engine in engines:
+                result.append((sortkey, factor, engine))
+    return result
+
+def search_layers_packing(layer_rects, spaces, pixel_space, engines=None, timebudget=10.0, processes=None, maxsize=0,
+        sizepolicy="exact", align=1):
+    # pack layer_rects with the best combination found within timebudget seconds,
+    # processes=None uses all cores, processes=1 searches without worker processes
+    # maxsize > 0 packs on pages of at most maxsize x maxsize
+    # layouts are compared by the texture size after rounding it up to align and by sizepolicy
+    # returns the (sortkey, width factor, engine) of the chosen layout
+    engines = engines or packing_engine_names
+    candidates = search_candidates(engines)
+    starttime = time.time()
+
+    # the default layout goes first, so there is always a result
+    best = pack_layers_candidate(layer_rects, pixel_space, maxsize, candidates[0], sizepolicy, align)
+    todo = candidates[1:]
+
+    if processes == 1:
+        for candidate in todo:
+            if time.time() - starttime > timebudget:
+                break
+            result = pack_layers_candidate(layer_rects, pixel_space, maxsize, candidate, sizepolicy, align)
+            if result is not None and (best is None or result[0] < best[0]):
+                best = result
+    else:
+        pool = multiprocessing.Pool(processes, init_search_worker, (layer_rects, pixel_space, maxsize, sizepolicy, align))
+        try:
+            results = pool.imap_unordered(pack_candidate, todo)
+            for _ in todo:
+                remaining = timebudget - (time.time() - starttime)
+                if remaining <= 0:
+                    break
+                try:
+                    result = results.next(remaining)
+                except multiprocessing.TimeoutError:
+                    break
+                if result is not None and (best is None or result[0] < best[0]):
+                    best = result
+        finally:
+            pool.terminate()
+
+    if best is None:
+        raise ValueError('sprites do not fit with any of the packing options')
+
+    # copy the positions and free spaces of the best layout
+    _, candidate, positions, freespaces = best
+    rects = dict((obj.index, obj) for obj in layer_rects)
+    for idx, x, y, rotated, page in positions:
+        rects[idx].pack_x = x
+        rects[idx].pack_y = y
+        rects[idx].page = page
+        if rects[idx].rotated != rotated:
+            rects[idx].rotate()
+    del spaces[:]
+    for x, y, w, h, page in freespaces:
+        space = spaceobj(x, y, w, h)
+        space.page = page
+        spaces.append(space)
+    return candidate
@@ -0,0 +1,224 @@
+# GIMP SpriteAtlas export session
+# All state of one export, the sprites, free spaces and options, in one object
+# so several atlases can be created at the same time in threads or processes
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+from .cache import (read_atlas_cache, write_atlas_cache, remove_atlas_cache, reuse_layers_packing,
+    previous_page_file)
+from .nameindex import write_name_index
+from .packing import (prepare_layers_metadata, calc_layers_packing, calc_layers_pages,
+    calc_atlas_size, page_count, page_rects, page_spaces, align_up, scaled_layer_rects,
+    size_policy_names, calc_policy_size, calc_policy_max_size)
+from .render import calc_sprite_info, compose_spriteatlas, compose_spriteatlas_strips, recompose_spriteatlas
+from .search import search_layers_packing
+from .stats import atlasStats, null_timer, write_atlas_stats
+from .writers import atlas_writers, scale_filetag, write_spriteatlas
+
+def parse_scales(text):
+    # list of scales from text like "0.5, 0.25"
+    try:
+        return [float(scale) for scale in text.replace(',', ' ').split()]
+    except ValueError:
+        raise ValueError('invalid scale list "%s"' % text)
+
+def calc_scale_factors(scales):
+    # the smaller variants are made by averaging blocks of pixels,
+    # so each scale has to be 1/2, 1/3, 1/4 etc, returns the block size of each scale
+    factors = []
+    for scale in scales:
+        factor = int(round(1.0 / scale)) if scale > 0 else 0
+        if factor < 1 or abs(scale * factor - 1.0) > 1e-6:
+            raise ValueError('scale %g is not 1 divided by a whole number' % scale)
+        factors.append(factor)
+    return factors
+
+def calc_lcm(values):
+    result = 1
+    for value in values:
+        a, b = result, value
+        while b:
+            a, b = b, a % b
+        result = result * value // a
+    return result
+
+class AtlasSession(object):
+    def __init__(self, outputtype=1, padding=True, engine="shelf", trim=False, dedupe=False, rotate=False, maxsize=0, incremental=False, nameindex=False,
+            scales=None, sizepolicy="exact", blockalign=0, stats=False):
+        # outputtype as in the plug-in dialog
+        self.outputtype = outputtype
+        # scales of the smaller variants of the texture next to the full size one, one layout for all,
+        # positions and packed boxes of the sprites are multiples of align so they can be divided by each scale,
+        # the sprites keep their own size and the rest of the box stays transparent
+        factors = calc_scale_factors(scales or [])
+        self.scales = [1] + sorted(set([1.0 / factor for factor in factors if factor > 1]), reverse=True)
+        self.align = calc_lcm(factors)
+        self.pixel_space = self.align if padding else 0
+        # texture size rounded up for GPUs, and optionally the sprites packed on whole compression blocks
+        if sizepolicy not in size_policy_names:
+            raise ValueError('unknown size policy "%s"' % sizepolicy)
+        self.sizepolicy = sizepolicy
+        self.blockalign = blockalign
+        self.engine = engine
+        self.trim = bool(trim)
+        self.dedupe = bool(dedupe)
+        # CSS and XML have no rotated flag, TexturePacker turns sprites clockwise, libGDX counter clockwise
+        rotation = atlas_writers[outputtype].rotation
+        self.rotate = bool(rotate) and rotation is not None
+        self.clockwise = rotation != "ccw"
+        self.maxsize = calc_policy_max_size(maxsize, sizepolicy)
+        self.incremental = bool(incremental)
+        # name index file, only for the JSON formats
+        self.nameindex = bool(nameindex) and atlas_writers[outputtype].nameindex
+        self.layer_rects = []
+        self.spaces = []
+        self.hashes = None
+        # previous export and the rectangles to draw again, when its layout is reused
+        self.cache = None
+        self.dirty = None
+        # time per phase, written in the JSON meta block and a .stats.json file
+        self.stats = atlasStats() if stats else None
+
+    def timer(self, phase):
+        # with session.timer("render"): ... adds the time to the statistics, if any
+        if self.stats is None:
+            return null_timer
+        return self.stats.timer(phase)
+
+    def settings(self):
+        # options that have to be the same to reuse the previous layout
+        return {"padding": self.pixel_space, "trim": self.trim, "dedupe": self.dedupe, "rotate": self.rotate,
+            "clockwise": self.clockwise, "maxsize": self.maxsize, "align": self.align,
+            "blockalign": self.blockalign}
+
+    def sprite_options(self):
+        # arguments of calc_sprite_info for this export
+        return self.trim, self.align, self.dedupe or self.incremental
+
+    def prepare(self, layers, buffers=None, infos=None):
+        # collect the sprites, buffers are the pixels in same order as the layers,
+        # or infos the calc_sprite_info of each layer when the pixels are read again to draw them,
+        # without either the sprites can't be trimmed, compared, rotated, cached or scaled
+        with self.timer("metadata"):
+            if buffers is None and infos is None:
+                self.trim = self.dedupe = self.rotate = self.incremental = False
+                if self.align > 1:
+                    self.pixel_space = 1 if self.pixel_space else 0
+                self.scales = [1]
+                self.align = 1
+            if infos is None and (self.trim or self.dedupe or self.incremental):
+                infos = [calc_sprite_info(buf, *self.sprite_options()) for buf in buffers]
+            trimrects = None
+            if self.trim:
+                trimrects = [trimrect for trimrect, hsh in infos]
+            if self.dedupe or self.incremental:
+                self.hashes = [hsh for trimrect, hsh in infos]
+            boxalign = calc_lcm([self.align, self.blockalign]) if self.blockalign > 1 else self.align
+            prepare_layers_metadata(layers, self.layer_rects, self.spaces, self.pixel_space, trimrects,
+                self.hashes if self.dedupe else None, self.rotate, self.align, boxalign)
+
+    def reuse(self, filename):
+        # keep unchanged sprites in place from the previous export,
+        # returns False when there is nothing to reuse and the sprites need packing
+        if not self.incremental:
+            return False
+        with self.timer("packing"):
+            self.cache = read_atlas_cache(filename)
+            self.dirty = reuse_layers_packing(self.layer_rects, self.spaces, self.pixel_space, self.cache,
+                self.hashes, self.settings(), self.maxsize)
+        return self.dirty is not None
+
+    def pack(self, search=False, timebudget=10.0, processes=None):
+        with self.timer("packing"):
+            if search:
+                search_layers_packing(self.layer_rects, self.spaces, self.pixel_space, timebudget=timebudget,
+                    processes=processes, maxsize=self.maxsize, sizepolicy=self.sizepolicy, align=self.align)
+            elif self.maxsize > 0:
+                calc_layers_pages(self.layer_rects, self.spaces, self.pixel_space, self.maxsize, self.engine)
+            else:
+                calc_layers_packing(self.layer_rects, self.spaces, self.pixel_space, self.engine)
+
+    def page_count(self):
+        return page_count(self.layer_rects)
+
+    def page_rects(self, page):
+        return page_rects(self.layer_rects, page)
+
+    def page_spaces(self, page):
+        return page_spaces(self.spaces, page)
+
+    def page_size(self, page):
+        # the last box on the grid, but not its padding
+        img_w, img_h = calc_atlas_size(self.page_rects(page))
+        return calc_policy_size(align_up(img_w, self.align), align_up(img_h, self.align), self.sizepolicy)
+
+    def variant_size(self, img_w, img_h, scale):
+        # texture size of a smaller variant, also rounded up by the size policy
+        factor = int(round(1.0 / scale))
+        return calc_policy_size(img_w // factor, img_h // factor, self.sizepolicy)
+
+    def previous_pages(self):
+        # page sizes of the previous export, only when its layout is reused
+        if self.dirty is None:
+            return []
+        return self.cache["pages"]
+
+    def previous_page_file(self, filename, page):
+        # png file of a page of the previous export when its layout is reused and the
+        # file is still the one written with it, else None
+        if self.dirty is None:
+            return None
+        return previous_page_file(filename, self.cache, page)
+
+    def compose(self, page, buffers, previous=None):
+        # pixels of one page, with the texture of the previous export only the dirty parts are drawn
+        img_w, img_h = self.page_size(page)
+        rects = self.page_rects(page)
+        with self.timer("render"):
+            if previous is not None and self.dirty is not None:
+                pagedirty = [(x, y, w, h) for pg, x, y, w, h in self.dirty if pg == page]
+                return recompose_spriteatlas(previous, rects, self.page_spaces(page), buffers, img_w, img_h, pagedirty,
+                    self.clockwise, self.stats)
+            return compose_spriteatlas(rects, self.page_spaces(page), buffers, img_w, img_h, self.clockwise, self.stats)
+
+    def compose_strips(self, page, buffers, strip_height):
+        # pixels of one page in horizontal strips, for writing huge textures with little memory,
+        # the strip height is rounded up to a multiple of align so each strip can be downscaled on its own,
+        # the strips are drawn while they are read, so the caller times the render phase
+        img_w, img_h = self.page_size(page)
+        strip_height = align_up(max(strip_height, 1), self.align)
+        return compose_spriteatlas_strips(self.page_rects(page), self.page_spaces(page), buffers, img_w, img_h,
+            strip_height, self.clockwise, self.stats)
+
+    def downscale(self, atlas, scale):
+        # texture of a smaller variant from the full size texture
+        with self.timer("render"):
+            small = atlas.downscaled(int(round(1.0 / scale)))
+            return small.padded(*self.variant_size(atlas.width, atlas.height, scale))
+
+    def summary(self, pagesizes):
+        # export statistics so far, None without statistics
+        if self.stats is None:
+            return None
+        return self.stats.summary(self.layer_rects, self.spaces, pagesizes)
+
+    def write(self, filename, filetag, pagesizes):
+        # coordinates file of each scale, the name index and, for the next incremental export, the cache file,
+        # the JSON meta block has the statistics up to here, the statistics file is written last
+        # so it also has the time of writing the other files
+        with self.timer("write"):
+            summary = self.summary(pagesizes)
+            for scale in self.scales:
+                factor = int(round(1.0 / scale))
+                rects = self.layer_rects if factor == 1 else scaled_layer_rects(self.layer_rects, factor)
+                sizes = [self.variant_size(img_w, img_h, scale) for img_w, img_h in pagesizes]
+                write_spriteatlas(self.outputtype, rects, scale_filetag(filename, scale), scale_filetag(filetag, scale),
+                    sizes[0][0], sizes[0][1], sizes, scale, summary)
+            if self.nameindex:
+                write_name_index(filename, self.layer_rects, len(pagesizes))
+            if self.incremental:
+                write_atlas_cache(filename, self.layer_rects, self.spaces, self.pixel_space, self.hashes, self.settings(), pagesizes)
+            else:
+                remove_atlas_cache(filename)
+        if self.stats is not None:
+            write_atlas_stats(filename, self.summary(pagesizes))
@@ -0,0 +1,171 @@
+# GIMP SpriteAtlas sprite sheet
+# Uniform grid of animation frames composed in memory, identical consecutive frames share one tile
+# and a frame map tells which tile to show for each frame, also for a whole folder of sequences at once
+# run as: python -m spriteatlas.spritesheet
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import argparse
+import math
+import os
+import sys
+
+from .loader import find_images, load_image, map_files
+from .pngio import write_png
+from .render import imgBuffer, calc_pixel_hash
+from .writers import ATLAS_PLUGIN_VERSION, json_string
+
+# sheet layouts, same numbering as the create_spritesheet.py dialog
+sheet_layouts = {"grid": 1, "row": 2, "column": 3}
+
+def frame_map_filename(filename):
+    return '%s.frames.json' % (filename)
+
+def calc_sheet_grid(count, layout=1):
+    # columns and rows of the sheet, a square-ish grid, a single row or a single column
+    count = max(count, 1)
+    if layout == 1:
+        cols = int(math.ceil(math.sqrt(count)))
+        rows = int(math.ceil(1.0 * count / cols))
+    else:
+        rows = 1 if layout == 2 else count
+        cols = 1 if layout == 3 else count
+    return cols, rows
+
+def collapse_frames(frames, dedupe=True):
+    # tiles of the sheet and the tile number of each frame,
+    # with dedupe a frame with the same pixels as the frame before it uses the same tile
+    tiles = []
+    framemap = []
+    lasthash = None
+    for buf in frames:
+        hsh = calc_pixel_hash(buf) if dedupe else None
+        if not (dedupe and tiles and hsh == lasthash):
+            tiles.append(buf)
+        framemap.append(len(tiles) - 1)
+        lasthash = hsh
+    return tiles, framemap
+
+def compose_spritesheet(tiles, frame_w, frame_h, layout=1, center=True):
+    # one blit per tile, left to right and top to bottom, smaller tiles are centered in their frame
+    cols, rows = calc_sheet_grid(len(tiles), layout)
+    sheet = imgBuffer(frame_w * cols, frame_h * rows)
+    for i, buf in enumerate(tiles):
+        x = (i % cols) * frame_w
+        y = (i // cols) * frame_h
+        if center and buf.width < frame_w:
+            x += (frame_w - buf.width) // 2
+        if center and buf.height < frame_h:
+            y += (frame_h - buf.height) // 2
+        sheet.blit(buf, x, y, 0, 0, min(buf.width, frame_w), min(buf.height, frame_h))
+    return sheet, cols, rows
+
+def write_frame_map(filename, imagename, sheet_w, sheet_h, frame_w, frame_h, cols, rows, framemap, names):
+    # tile number of each frame, the position of tile n is column n % columns and row n // columns
+    f = open(frame_map_filename(filename), 'w')
+    f.write("{\n")
+    f.write("\t\"image\":%s,\n" % json_string(imagename))
+    f.write("\t\"size\":{\"w\":%d,\"h\":%d},\n" % (sheet_w, sheet_h))
+    f.write("\t\"frame\":{\"w\":%d,\"h\":%d},\n" % (frame_w, frame_h))
+    f.write("\t\"columns\":%d,\n" % cols)
+    f.write("\t\"rows\":%d,\n" % rows)
+    f.write("\t\"tiles\":%d,\n" % (max(framemap) + 1 if framemap else 0))
+    f.write("\t\"frames\":[%s],\n" % ",".join(["%d" % tile for tile in framemap]))
+    f.write("\t\"names\":[%s],\n" % ",".join([json_string(name) for name in names]))
+    f.write("\t\"meta\":{\n")
+    f.write("\t\t\"app\":\"https://github.com/BdR76/GimpSpriteAtlas/\",\n")
+    f.write("\t\t\"version\":\"GIMP SpriteAtlas plug-in %s\"\n" % ATLAS_PLUGIN_VERSION)
+    f.write("\t}\n")
+    f.write("}")
+    f.close()
+
+def create_spritesheet_frames(frames, filename, layout=1, center=True, dedupe=True, frame_w=None, frame_h=None):
+    # write the sheet png and its frame map, the frame size is the largest frame unless given,
+    # returns the sheet size, number of tiles and number of frames
+    if frame_w is None:
+        frame_w = max([buf.width for buf in frames])
+    if frame_h is None:
+        frame_h = max([buf.height for buf in frames])
+    tiles, framemap = collapse_frames(frames, dedupe)
+    sheet, cols, rows = compose_spritesheet(tiles, frame_w, frame_h, layout, center)
+    write_png('%s.png' % filename, sheet.width, sheet.height, sheet.data)
+    write_frame_map(filename, '%s.png' % os.path.basename(filename), sheet.width, sheet.height, frame_w, frame_h,
+        cols, rows, framemap, [buf.name for buf in frames])
+    return (sheet.width, sheet.height), len(tiles), len(frames)
+
+def sequence_name(filename):
+    # name of the sequence of a frame file, walk_01.png and walk_02.png are both "walk"
+    base = os.path.splitext(os.path.basename(filename))[0]
+    return base.rstrip('0123456789').rstrip('_-. ') or base
+
+def frame_order(filename):
+    # sort key of a frame file, the frame number as a number so walk2.png comes before walk10.png
+    base = os.path.splitext(os.path.basename(filename))[0]
+    name = base.rstrip('0123456789')
+    number = base[len(name):]
+    return name, int(number) if number else -1, base
+
+def find_frames(source):
+    # png files of one sequence in frame order, source is a folder or a pattern like "walk_*.png"
+    return sorted(find_images(source), key=frame_order)
+
+def find_sequences(folder):
+    # animation sequences in a folder as (name, filenames), each subfolder with png files is one sequence,
+    # png files in the folder itself are grouped by their name without the frame number
+    sequences = {}
+    for filename in find_images(folder):
+        sequences.setdefault(sequence_name(filename), []).append(filename)
+    for entry in os.listdir(folder):
+        path = os.path.join(folder, entry)
+        if os.path.isdir(path):
+            filenames = find_images(path)
+            if filenames:
+                sequences.setdefault(entry, []).extend(filenames)
+    return [(name, sorted(filenames, key=frame_order)) for name, filenames in sorted(sequences.items())]
+
+def create_spritesheet_job(job):
+    # one sequence of a batch, a tuple so it can be passed to a worker process,
+    # load reads the pixels of one file
+    name, filenames, foldername, layout, center, dedupe, load = job
+    frames = [load(fn) for fn in filenames]
+    size, tiles, count = create_spritesheet_frames(frames, os.path.join(foldername, name), layout, center, dedupe)
+    return name, size, tiles, count
+
+def create_spritesheet_batch(inputfolder, foldername, layout=1, center=True, dedupe=True, processes=None, load=load_image):
+    # one sheet and frame map per sequence of the folder, several sequences at the same time in worker processes,
+    # in GIMP processes=1 with a load that uses GIMP's PNG loader, a worker process would start another instance of the plug-in
+    jobs = [(name, filenames, foldername, layout, center, dedupe, load) for name, filenames in find_sequences(inputfolder)]
+    return map_files(create_spritesheet_job, jobs, processes)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='spriteatlas.spritesheet',
+        description='Create sprite sheets of uniformly sized frames from a folder of animation sequences (GIMP SpriteAtlas %s).' % ATLAS_PLUGIN_VERSION)
+    parser.add_argument('inputfolder', help='folder with a subfolder or numbered PNG files per sequence, or with -n the frames of one sequence')
+    parser.add_argument('-n', '--name', default=None, help='make one sheet with this name of all PNG files in inputfolder, or a pattern like "walk_*.png"')
+    parser.add_argument('-o', '--output', default='.', help='export folder (default: current folder)')
+    parser.add_argument('-l', '--layout', default='grid', choices=sorted(sheet_layouts), help='sheet layout (default: grid)')
+    parser.add_argument('--no-center', action='store_true', help='do not center smaller frames in their tile')
+    parser.add_argument('--no-dedupe', action='store_true', help='give every frame its own tile, also when it is the same as the frame before')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of processes, one sequence per process (default: all cores)')
+    args = parser.parse_args(argv)
+
+    layout = sheet_layouts[args.layout]
+    try:
+        if args.name:
+            filenames = find_frames(args.inputfolder)
+            if not filenames:
+                raise ValueError('no png files found in %s' % args.inputfolder)
+            results = [create_spritesheet_job((args.name, filenames, args.output, layout, not args.no_center, not args.no_dedupe, load_image))]
+        else:
+            results = create_spritesheet_batch(args.inputfolder, args.output, layout, not args.no_center, not args.no_dedupe, args.jobs)
+            if not results:
+                raise ValueError('no png files found in %s' % args.inputfolder)
+    except (IOError, OSError, ValueError) as e:
+        sys.stderr.write('spriteatlas.spritesheet: %s\n' % e)
+        return 1
+    for name, (sheet_w, sheet_h), tiles, count in results:
+        print('%s: %dx%d, %d tiles for %d frames' % (os.path.join(args.output, name), sheet_w, sheet_h, tiles, count))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+# GIMP SpriteAtlas export statistics
+# Wall time per phase of an export and the numbers of the result,
+# for the JSON meta block and a separate stats file
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import json
+import time
+
+# phases in the order of an export, load is reading png files instead of layers
+stats_phase_names = ("load", "metadata", "packing", "render", "extrude", "watermark", "write")
+
+def stats_filename(filename):
+    return '%s.stats.json' % (filename)
+
+# time of one phase, used as: with stats.timer("packing"):
+# a phase inside another phase is not counted twice, the outer phase only gets its own time
+class phaseTimer(object):
+    def __init__(self, stats, phase):
+        self.stats = stats
+        self.phase = phase
+
+    def __enter__(self):
+        self.stats.stack.append([time.time(), 0.0])
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        starttime, inner = self.stats.stack.pop()
+        elapsed = time.time() - starttime
+        self.stats.seconds[self.phase] = self.stats.seconds.get(self.phase, 0.0) + elapsed - inner
+        if self.stats.stack:
+            self.stats.stack[-1][1] += elapsed
+        return False
+
+# does nothing, when there are no statistics
+class nullTimer(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+null_timer = nullTimer()
+
+def stats_timer(stats, phase):
+    # timer of a phase, also when stats is None
+    return stats.timer(phase) if stats is not None else null_timer
+
+class atlasStats(object):
+    def __init__(self):
+        # seconds per phase, and the timers that are running
+        self.seconds = dict([(phase, 0.0) for phase in stats_phase_names])
+        self.stack = []
+
+    def timer(self, phase):
+        return phaseTimer(self, phase)
+
+    def summary(self, layer_rects, spaces, pagesizes):
+        # sprites, free spaces and texture sizes of the export, occupancy is the percentage
+        # of the texture area covered by sprites, not counting the extruded edges
+        frames = len(layer_rects) + sum([len(obj.aliases) for obj in layer_rects])
+        spritearea = sum([obj.width * obj.height for obj in layer_rects])
+        atlasarea = sum([w * h for w, h in pagesizes])
+        seconds = dict([(phase, round(value, 4)) for phase, value in self.seconds.items()])
+        return {
+            "sprites": len(layer_rects),
+            "frames": frames,
+            "freespaces": len(spaces),
+            "pages": len(pagesizes),
+            "sizes": [[w, h] for w, h in pagesizes],
+            "occupancy": round(100.0 * spritearea / atlasarea, 2) if atlasarea else 0.0,
+            "seconds": seconds,
+            "total_seconds": round(sum(self.seconds.values()), 4),
+        }
+
+def stats_json(summary):
+    # statistics as one line of JSON, keys sorted so the files can be compared
+    return json.dumps(summary, sort_keys=True)
+
+def write_atlas_stats(filename, summary):
+    outputfile = open(stats_filename(filename), 'w')
+    outputfile.write(json.dumps(summary, sort_keys=True, indent=2, separators=(',', ': ')))
+    outputfile.write('\n')
+    outputfile.close()
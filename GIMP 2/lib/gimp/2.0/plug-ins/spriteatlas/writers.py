@@ -0,0 +1,254 @@
+# GIMP SpriteAtlas metadata writers
+# Export sprite coordinates in json/atlas/css/xml/binary format
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import json
+import struct
+
+from .stats import stats_json
+
+ATLAS_PLUGIN_VERSION = "v0.3"
+
+# export format, write(f, layer_rects, filetag, pagesizes, scale) streams the coordinates to an open file,
+# rotation is "cw" or "ccw" for formats with a rotated flag, perpage formats get one file per page,
+# nameindex formats list the frames per texture so a name index can refer to them,
+# stats formats get the export statistics as write(..., stats=summary)
+class atlasWriter(object):
+    def __init__(self, name, extension, write, binary=False, rotation=None, perpage=False, nameindex=False, stats=False):
+        self.name = name
+        self.extension = extension
+        self.write = write
+        self.binary = binary
+        self.rotation = rotation
+        self.perpage = perpage
+        self.nameindex = nameindex
+        self.stats = stats
+
+# export formats by file type number, same numbering as the plug-in dialog
+atlas_writers = {}
+
+def register_writer(outputtype, writer):
+    atlas_writers[outputtype] = writer
+
+def page_filetag(filetag, page, pages):
+    # texture file name of a page, numbered when there is more than one page
+    if pages > 1:
+        return '%s-%d' % (filetag, page)
+    return filetag
+
+def scale_filetag(filetag, scale):
+    # file name of a smaller variant, for example sprites@0.5x
+    if scale == 1:
+        return filetag
+    return '%s@%gx' % (filetag, scale)
+
+def all_frames(layer_rects):
+    # all sprites including the aliases of identical sprites, which get the packed position of the first one
+    for obj in layer_rects:
+        yield obj
+        for alias in obj.aliases:
+            alias.pack_x = obj.pack_x
+            alias.pack_y = obj.pack_y
+            alias.page = obj.page
+            if alias.rotated != obj.rotated:
+                alias.rotate()
+            yield alias
+
+def json_string(text):
+    # quoted and escaped JSON string
+    return json.dumps(text)
+
+def xml_attr(text):
+    # escaped XML attribute value
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+def json_frame(obj):
+    # TexturePacker frame data of one sprite, frame size is before rotating
+    w, h = obj.frame_size()
+    strframe = '"frame":{"x":%d,"y":%d,"w":%d,"h":%d},"rotated":"%s","trimmed":"%s",' % (obj.pack_x, obj.pack_y, w, h, "true" if obj.rotated else "false", "true" if obj.trimmed else "false")
+    strframe += '"spriteSourceSize":{"x":%d,"y":%d,"w":%d,"h":%d},' % (obj.trim_x, obj.trim_y, w, h)
+    strframe += '"sourceSize":{"w":%d,"h":%d}' % (obj.src_width, obj.src_height)
+    return strframe
+
+def write_json_frames(f, frames, indent, hashframes):
+    # frames as hash entries or array items, comma separated
+    separator = ''
+    for obj in frames:
+        if hashframes:
+            f.write('%s\n%s%s:{%s}' % (separator, indent, json_string(obj.name), json_frame(obj)))
+        else:
+            f.write('%s\n%s{"filename":%s,%s}' % (separator, indent, json_string(obj.name), json_frame(obj)))
+        separator = ','
+
+def write_json_meta(f, strimage, stats=None):
+    # strimage is the image, size and scale of a single texture, stats the export statistics
+    lines = ["\t\t\"app\":\"https://github.com/BdR76/GimpSpriteAtlas/\"",
+        "\t\t\"version\":\"GIMP SpriteAtlas plug-in %s\"" % ATLAS_PLUGIN_VERSION,
+        "\t\t\"author\":\"Bas de Reuver\""]
+    if strimage:
+        lines.append(strimage)
+    if stats is not None:
+        lines.append("\t\t\"stats\":%s" % stats_json(stats))
+    f.write("\t\"meta\":{\n")
+    f.write(",\n".join(lines))
+    f.write("\n\t}\n")
+    f.write("}")
+
+def write_spriteatlas_json(f, layer_rects, filetag, pagesizes, scale, hashframes, stats=None):
+    if len(pagesizes) > 1:
+        # TexturePacker multipack, same as the Phaser 3 multi atlas, one texture per page
+        f.write("{\n\t\"textures\":[")
+        for page, (img_w, img_h) in enumerate(pagesizes):
+            f.write("%s\n\t\t{\n" % ("," if page > 0 else ""))
+            f.write("\t\t\t\"image\":%s,\n" % json_string('%s.png' % page_filetag(filetag, page, len(pagesizes))))
+            f.write("\t\t\t\"format\":\"RGBA8888\",\n")
+            f.write("\t\t\t\"size\":{\"w\":%d,\"h\":%d},\n" % (img_w, img_h))
+            f.write("\t\t\t\"scale\":%g,\n" % scale)
+            f.write("\t\t\t\"frames\":%s" % ("{" if hashframes else "["))
+            write_json_frames(f, [obj for obj in all_frames(layer_rects) if obj.page == page], "\t\t\t\t", hashframes)
+            f.write("\n\t\t\t%s\n\t\t}" % ("}" if hashframes else "]"))
+        f.write("\n\t],\n")
+        write_json_meta(f, None, stats)
+        return
+
+    img_w, img_h = pagesizes[0]
+    f.write("{\n\t\"frames\":%s" % ("{" if hashframes else "["))
+    write_json_frames(f, all_frames(layer_rects), "\t\t", hashframes)
+    f.write("\n\t%s,\n" % ("}" if hashframes else "]"))
+    strimage = "\t\t\"image\":%s,\n" % json_string('%s.png' % filetag)
+    strimage += "\t\t\"size\":{\"w\":%d,\"h\":%d},\n" % (img_w, img_h)
+    strimage += "\t\t\"scale\":%g" % scale
+    write_json_meta(f, strimage, stats)
+
+def write_spriteatlas_jsonarray(f, layer_rects, filetag, pagesizes, scale=1, stats=None):
+    write_spriteatlas_json(f, layer_rects, filetag, pagesizes, scale, False, stats)
+
+def write_spriteatlas_jsonhash(f, layer_rects, filetag, pagesizes, scale=1, stats=None):
+    write_spriteatlas_json(f, layer_rects, filetag, pagesizes, scale, True, stats)
+
+def write_spriteatlas_libgdx(f, layer_rects, filetag, pagesizes, scale=1):
+    for page, (img_w, img_h) in enumerate(pagesizes):
+        # one block per page, separated by an empty line
+        if page > 0:
+            f.write("\n")
+        f.write("%s.png\nsize: %d,%d\nformat: RGBA8888\nfilter: Linear,Linear\nrepeat: none\n" % (page_filetag(filetag, page, len(pagesizes)), img_w, img_h))
+
+        # insert sprite metadata of this page
+        for obj in all_frames(layer_rects):
+            if obj.page != page:
+                continue
+            # libGDX size is before rotating, offset is from the bottom-left of the original image
+            w, h = obj.frame_size()
+            f.write("%s\n  rotate: %s\n  xy: %d, %d\n  size: %d, %d\n  orig: %d, %d\n  offset: %d, %d\n  index: -1\n" % (obj.name, "true" if obj.rotated else "false", obj.pack_x, obj.pack_y, w, h, obj.src_width, obj.src_height, obj.trim_x, obj.src_height - obj.trim_y - h))
+
+def write_spriteatlas_css(f, layer_rects, filetag, pagesizes, scale=1):
+    f.write("/* GIMP SpriteAtlas plug-in %s by Bas de Reuver 2023 */\n" % ATLAS_PLUGIN_VERSION)
+
+    # insert all sprite metadata
+    for obj in all_frames(layer_rects):
+        f.write(".%s {\n" % obj.name)
+        f.write("\tbackground: url('%s.png') no-repeat -%dpx -%dpx;\n" % (page_filetag(filetag, obj.page, len(pagesizes)), obj.pack_x, obj.pack_y))
+        f.write("\twidth: %dpx;\n" % obj.width)
+        f.write("\theight: %dpx;\n" % obj.height)
+        f.write("}\n")
+
+def write_spriteatlas_xml(f, layer_rects, filetag, pagesizes, scale=1):
+    # Starling texture atlas has one image, with more pages this is written once per page
+    f.write('<textureatlas xmlns="http://www.w3.org/1999/xhtml" imagepath="%s">\n' % xml_attr('%s.png' % filetag))
+    f.write('\t<!-- GIMP SpriteAtlas plug-in %s by Bas de Reuver 2023 -->\n' % ATLAS_PLUGIN_VERSION)
+
+    # insert all sprite metadata
+    for obj in all_frames(layer_rects):
+        f.write('\t<subtexture name="%s" x="%d" y="%d" width="%d" height="%d"' % (xml_attr(obj.name), obj.pack_x, obj.pack_y, obj.width, obj.height))
+        if obj.trimmed:
+            # position and size of the original image, same as Starling texture atlas
+            f.write(' frameX="%d" frameY="%d" frameWidth="%d" frameHeight="%d"' % (-obj.trim_x, -obj.trim_y, obj.src_width, obj.src_height))
+        f.write('>\n')
+        f.write('\t</subtexture>\n')
+
+    f.write('</textureatlas>\n')
+
+# binary format, all numbers little-endian:
+# header, page table, frame table and a string pool with the utf-8 names,
+# each name ends with a zero byte, name offsets are from the start of the string pool
+BINARY_MAGIC = b'SATL'
+# version 2 has 32-bit positions and sizes, for textures without a maximum size
+BINARY_VERSION = 2
+# magic, version, number of pages, number of frames, string pool size
+binary_header = struct.Struct('<4sHHII')
+# name offset, name length, width, height
+binary_page = struct.Struct('<IH2xII')
+# name offset, name length, page, flags, x, y, w, h (before rotating),
+# trimmed x, y in the source image, source width, height
+binary_frame = struct.Struct('<IHHH2xIIIIIIII')
+# frame flags, rotated sprites are turned clockwise
+BINARY_ROTATED = 1
+BINARY_TRIMMED = 2
+
+def utf8_bytes(text):
+    if isinstance(text, bytes):
+        return text
+    return text.encode('utf-8')
+
+def write_spriteatlas_binary(f, layer_rects, filetag, pagesizes, scale=1):
+    pool = bytearray()
+    def add_string(text):
+        data = utf8_bytes(text)
+        offset = len(pool)
+        pool.extend(data + b'\x00')
+        return offset, len(data)
+
+    pages = []
+    for page, (img_w, img_h) in enumerate(pagesizes):
+        offset, length = add_string('%s.png' % page_filetag(filetag, page, len(pagesizes)))
+        pages.append(binary_page.pack(offset, length, img_w, img_h))
+    frames = []
+    for obj in all_frames(layer_rects):
+        offset, length = add_string(obj.name)
+        w, h = obj.frame_size()
+        flags = (BINARY_ROTATED if obj.rotated else 0) | (BINARY_TRIMMED if obj.trimmed else 0)
+        frames.append(binary_frame.pack(offset, length, obj.page, flags, obj.pack_x, obj.pack_y, w, h,
+            obj.trim_x, obj.trim_y, obj.src_width, obj.src_height))
+
+    f.write(binary_header.pack(BINARY_MAGIC, BINARY_VERSION, len(pages), len(frames), len(pool)))
+    f.write(b''.join(pages))
+    f.write(b''.join(frames))
+    f.write(bytes(pool))
+
+register_writer(1, atlasWriter("jsonarray", "json", write_spriteatlas_jsonarray, rotation="cw", nameindex=True, stats=True))
+register_writer(2, atlasWriter("jsonhash", "json", write_spriteatlas_jsonhash, rotation="cw", nameindex=True, stats=True))
+register_writer(3, atlasWriter("libgdx", "atlas", write_spriteatlas_libgdx, rotation="ccw"))
+register_writer(4, atlasWriter("css", "css", write_spriteatlas_css))
+register_writer(5, atlasWriter("xml", "xml", write_spriteatlas_xml, perpage=True))
+register_writer(6, atlasWriter("binary", "bin", write_spriteatlas_binary, binary=True, rotation="cw"))
+
+def write_atlas_file(writer, filename, layer_rects, filetag, pagesizes, scale, stats=None):
+    # export coordinate variables to file, the buffered file writes them in blocks
+    outputname = '%s.%s' % (filename, writer.extension)
+    outputfile = open(outputname, 'wb' if writer.binary else 'w', 65536)
+    try:
+        if writer.stats and stats is not None:
+            writer.write(outputfile, layer_rects, filetag, pagesizes, scale, stats=stats)
+        else:
+            writer.write(outputfile, layer_rects, filetag, pagesizes, scale)
+    finally:
+        outputfile.close()
+
+def write_spriteatlas(outputtype, layer_rects, filename, filetag, img_w, img_h, pagesizes=None, scale=1, stats=None):
+    # write to output file, outputtype as in the plug-in dialog
+    # pagesizes is the width, height of each page when the sprites are on more than one page
+    # scale is the size of the texture compared to the layers, for the formats that have a scale
+    # stats is the summary of the export statistics, for the formats that have a place for it
+    if outputtype not in atlas_writers:
+        raise ValueError('unknown export file type %s' % outputtype)
+    writer = atlas_writers[outputtype]
+    if pagesizes is None:
+        pagesizes = [(img_w, img_h)]
+    pages = len(pagesizes)
+    if writer.perpage and pages > 1:
+        for page in range(pages):
+            rects = [obj for obj in layer_rects if obj.page == page]
+            write_atlas_file(writer, page_filetag(filename, page, pages), rects, page_filetag(filetag, page, pages), [pagesizes[page]], scale, stats)
+    else:
+        write_atlas_file(writer, filename, layer_rects, filetag, pagesizes, scale, stats)
@@ -0,0 +1,12 @@
+# GIMP SpriteAtlas tests
+# The spriteatlas package lives with the plug-ins, run as: python -m pytest tests
+# or: python -m unittest discover -s tests -t .
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import os
+import sys
+
+PLUGIN_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'GIMP 2', 'lib', 'gimp', '2.0', 'plug-ins')
+if PLUGIN_FOLDER not in sys.path:
+    sys.path.insert(0, PLUGIN_FOLDER)
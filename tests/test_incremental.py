@@ -0,0 +1,85 @@
+# GIMP SpriteAtlas incremental export tests
+# Every frame of an updated texture has to have the pixels of its sprite
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from spriteatlas.cache import cache_filename
+from spriteatlas.cli import create_spriteatlas_folder
+from spriteatlas.pngio import read_png, write_png
+
+def sprite_pixels(i, w, h, version=0):
+    # one color per sprite, so a sprite drawn at the wrong place is noticed
+    return bytearray([i % 251, (i // 251) * 40 + version, 200, 255]) * (w * h)
+
+class IncrementalExportTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.inputfolder = os.path.join(self.folder, 'in')
+        os.mkdir(self.inputfolder)
+        self.outputname = os.path.join(self.folder, 'sprites')
+        rnd = random.Random(5)
+        self.sizes = []
+        for i in range(120):
+            w = rnd.randint(1, 40)
+            h = rnd.randint(1, 40)
+            self.sizes.append((w, h))
+            self.write_sprite(i)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def write_sprite(self, i, version=0):
+        w, h = self.sizes[i]
+        write_png(os.path.join(self.inputfolder, 'spr%03d.png' % i), w, h, sprite_pixels(i, w, h, version))
+
+    def export(self, **options):
+        create_spriteatlas_folder(self.inputfolder, 'sprites', self.folder, 2, True, processes=1, **options)
+
+    def assertFramesMatch(self, versions):
+        with open('%s.json' % self.outputname) as f:
+            frames = json.load(f)["frames"]
+        img_w, img_h, data = read_png('%s.png' % self.outputname)
+        for name, frame in frames.items():
+            i = int(name[3:])
+            x, y, w, h = frame["frame"]["x"], frame["frame"]["y"], frame["frame"]["w"], frame["frame"]["h"]
+            pixels = bytearray()
+            for row in range(y, y + h):
+                pixels += data[(row * img_w + x) * 4:(row * img_w + x + w) * 4]
+            self.assertEqual(pixels, sprite_pixels(i, w, h, versions.get(i, 0)), name)
+
+    def test_changed_sprite(self):
+        self.export(incremental=True)
+        self.write_sprite(7, 1)
+        self.export(incremental=True)
+        self.assertFramesMatch({7: 1})
+
+    def test_texture_of_other_export(self):
+        # the texture was overwritten by an export with another layout, the cache is not used for it
+        self.export(incremental=True, sizepolicy="pow2")
+        self.export(engine="maxrects-bssf")
+        self.assertFalse(os.path.exists(cache_filename(self.outputname)))
+        self.write_sprite(7, 1)
+        self.export(incremental=True, sizepolicy="pow2")
+        self.assertFramesMatch({7: 1})
+
+    def test_changed_texture(self):
+        # the texture was replaced after the incremental export by one of the same size
+        self.export(incremental=True, sizepolicy="pow2")
+        with open(cache_filename(self.outputname)) as f:
+            cache = f.read()
+        self.export(engine="skyline", sizepolicy="pow2")
+        with open(cache_filename(self.outputname), 'w') as f:
+            f.write(cache)
+        self.write_sprite(7, 1)
+        self.export(incremental=True, sizepolicy="pow2")
+        self.assertFramesMatch({7: 1})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+# GIMP SpriteAtlas name index tests
+# Every name of an export has to resolve to the same frame as in the JSON file
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import collections
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from spriteatlas import nameindex
+from spriteatlas.cli import create_spriteatlas_folder
+from spriteatlas.nameindex import calc_name_index, name_index_filename, read_name_index
+from spriteatlas.pngio import write_png
+
+def json_frames(data):
+    # (page, number, frame) of each name, for single and multi page JSON files
+    textures = data["textures"] if "textures" in data else [data]
+    result = {}
+    for page, texture in enumerate(textures):
+        frames = texture["frames"]
+        if isinstance(frames, dict):
+            frames = [dict(frame, filename=name) for name, frame in frames.items()]
+        for number, frame in enumerate(frames):
+            result[frame["filename"]] = (page, number, frame)
+    return result
+
+class NameIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.inputfolder = os.path.join(self.folder, 'in')
+        os.mkdir(self.inputfolder)
+        rnd = random.Random(1)
+        for i in range(300):
+            w = rnd.randint(1, 40)
+            h = rnd.randint(1, 40)
+            # a transparent border to trim and a few identical sprites
+            color = bytearray([i % 7, 0, 0, 255]) if i % 10 else bytearray([1, 2, 3, 255])
+            data = bytearray(w * h * 4)
+            for y in range(h // 4, h):
+                data[y * w * 4:(y + 1) * w * 4] = color * w
+            write_png(os.path.join(self.inputfolder, 'spr%03d.png' % i), w, h, data)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def check_export(self, outputtype, **options):
+        create_spriteatlas_folder(self.inputfolder, 'sprites', self.folder, outputtype, True, processes=1, nameindex=True, **options)
+        outputname = os.path.join(self.folder, 'sprites')
+        with open('%s.json' % outputname) as f:
+            # frame numbers are the order in the file, also of the jsonhash objects
+            frames = json_frames(json.load(f, object_pairs_hook=collections.OrderedDict))
+        index = read_name_index(name_index_filename(outputname))
+        try:
+            self.assertEqual(index.count, len(frames))
+            for name, (page, number, frame) in frames.items():
+                found = index.lookup(name)
+                self.assertEqual((found.page, found.number), (page, number))
+                self.assertEqual((found.x, found.y, found.w, found.h),
+                    (frame["frame"]["x"], frame["frame"]["y"], frame["frame"]["w"], frame["frame"]["h"]))
+                self.assertEqual((found.rotated, found.trimmed), (frame["rotated"] == "true", frame["trimmed"] == "true"))
+                self.assertEqual((found.trim_x, found.trim_y), (frame["spriteSourceSize"]["x"], frame["spriteSourceSize"]["y"]))
+                self.assertEqual((found.src_width, found.src_height), (frame["sourceSize"]["w"], frame["sourceSize"]["h"]))
+            self.assertEqual(index.lookup('not a sprite'), None)
+        finally:
+            index.close()
+
+    def test_jsonhash(self):
+        self.check_export(2, trim=True, dedupe=True, rotate=True)
+
+    def test_jsonarray_pages(self):
+        self.check_export(1, trim=True, rotate=True, maxsize=128)
+
+    def test_jsonhash_pages(self):
+        self.check_export(2, dedupe=True, maxsize=128)
+
+    def test_colliding_names(self):
+        # same 32-bit FNV-1a hash, no seed could tell these apart with a 32-bit base hash
+        salt, seeds, slots = calc_name_index([b'sprite_4cf86b11', b'sprite_376e38e0', b'a'])
+        self.assertEqual(sorted(slots), [0, 1, 2])
+
+    def test_salt(self):
+        # when two names get the same base hash the next salt is tried, and the loader uses that salt
+        fnv_hash = nameindex.fnv_hash
+        nameindex.fnv_hash = lambda data, salt=0: 0 if salt == 0 else fnv_hash(data, salt)
+        try:
+            salt, seeds, slots = calc_name_index([b'walk', b'run', b'jump'])
+            self.assertEqual(salt, 1)
+            self.check_export(2)
+        finally:
+            nameindex.fnv_hash = fnv_hash
+        index = read_name_index(name_index_filename(os.path.join(self.folder, 'sprites')))
+        try:
+            self.assertEqual(index.salt, 1)
+            self.assertNotEqual(index.lookup('spr000'), None)
+        finally:
+            index.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+# GIMP SpriteAtlas packing tests
+# The indexed shelf packer has to give exactly the same layout as the original backward scan
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import random
+import unittest
+
+from spriteatlas.packing import (imgRect, spaceobj, prepare_layers_metadata, pack_shelf, calc_atlas_size,
+    calc_policy_size, align_up)
+from spriteatlas.search import search_candidates, pack_layers_candidate, search_layers_packing
+
+class layerSize(object):
+    def __init__(self, name, width, height):
+        self.name = name
+        self.width = width
+        self.height = height
+
+def pack_backward_scan(layer_rects, spaces, pixel_space):
+    # frozen copy of calc_layers_packing before the space index, a linear scan from the last space,
+    # with the room for padding after the box that multi-page atlases added to the fit test
+    for box in layer_rects:
+        i = len(spaces)-1
+        while i >= 0:
+            space = spaces[i]
+            if (box.tot_width + pixel_space > space.width or box.tot_height + pixel_space > space.height):
+                i -= 1
+                continue
+            box.pack_x = space.x + box.ext_left
+            box.pack_y = space.y + box.ext_up
+            if (box.tot_width + pixel_space == space.width and box.tot_height + pixel_space == space.height):
+                # del instead of spaces.remove(), under Python 2 that compares with __cmp__ and can remove another space
+                del spaces[i]
+            elif (box.tot_height + pixel_space == space.height):
+                spaces[i].x += (box.tot_width + pixel_space)
+                spaces[i].width -= (box.tot_width + pixel_space)
+            elif (box.tot_width + pixel_space == space.width):
+                spaces[i].y += (box.tot_height + pixel_space)
+                spaces[i].height -= (box.tot_height + pixel_space)
+            else:
+                spaces.append(spaceobj(space.x + box.tot_width + pixel_space, space.y, space.width - box.tot_width - pixel_space, box.tot_height + pixel_space))
+                spaces[i].y += (box.tot_height + pixel_space)
+                spaces[i].height -= (box.tot_height + pixel_space)
+            break
+
+def random_layers(rnd, count, extrude=False):
+    result = []
+    for i in range(count):
+        ext = rnd.choice(['', ' [ext=UD]', ' [ext=LR]', ' [ext=UDLR:2]']) if extrude else ''
+        result.append(layerSize('spr%d%s.png' % (i, ext), rnd.randint(1, 64), rnd.randint(1, 64)))
+    return result
+
+def pack_layout(layers, pixel_space, packer):
+    layer_rects = []
+    spaces = []
+    prepare_layers_metadata(layers, layer_rects, spaces, pixel_space)
+    packer(layer_rects, spaces, pixel_space)
+    boxes = sorted([(obj.index, obj.pack_x, obj.pack_y) for obj in layer_rects])
+    return boxes, [(space.x, space.y, space.width, space.height) for space in spaces]
+
+class ShelfPackingTest(unittest.TestCase):
+    def assertSameLayout(self, layers, pixel_space):
+        old = pack_layout(layers, pixel_space, pack_backward_scan)
+        new = pack_layout(layers, pixel_space, pack_shelf)
+        self.assertEqual(old, new)
+
+    def test_random_sizes(self):
+        rnd = random.Random(1)
+        for n in range(60):
+            layers = random_layers(rnd, rnd.randint(1, 400))
+            for pixel_space in (0, 1):
+                self.assertSameLayout(layers, pixel_space)
+
+    def test_extruded_edges(self):
+        rnd = random.Random(2)
+        for n in range(30):
+            layers = random_layers(rnd, rnd.randint(1, 400), extrude=True)
+            for pixel_space in (0, 1):
+                self.assertSameLayout(layers, pixel_space)
+
+    def test_uniform_tiles(self):
+        for count in (1, 2, 63, 64, 65, 1000):
+            layers = [layerSize('tile%d.png' % i, 32, 32) for i in range(count)]
+            for pixel_space in (0, 1):
+                self.assertSameLayout(layers, pixel_space)
+
+    def test_many_sprites(self):
+        # more spaces than the initial capacity of the index, so it has to grow
+        layers = random_layers(random.Random(3), 5000)
+        self.assertSameLayout(layers, 1)
+
+class SpriteNameTest(unittest.TestCase):
+    def test_extension(self):
+        # the png files found in a folder can also have an uppercase extension
+        for name in ('walk.png', 'walk.PNG', 'walk.Jpg'):
+            self.assertEqual(imgRect(name, 1, 1, 0).name, 'walk')
+        self.assertEqual(imgRect('walk.gif', 1, 1, 0).name, 'walk.gif')
+
+class SearchPackingTest(unittest.TestCase):
+    def test_size_policy(self):
+        # the chosen layout has the smallest texture after rounding, not the smallest packed area
+        layers = random_layers(random.Random(4), 150)
+        for sizepolicy, align in (("pow2", 1), ("square-pow2", 1), ("exact", 4)):
+            layer_rects = []
+            spaces = []
+            prepare_layers_metadata(layers, layer_rects, spaces, align, align=align, boxalign=align)
+            areas = []
+            for candidate in search_candidates(("shelf", "skyline")):
+                result = pack_layers_candidate(layer_rects, align, 0, candidate, sizepolicy, align)
+                if result is not None:
+                    areas.append(result[0][1])
+            search_layers_packing(layer_rects, spaces, align, ("shelf", "skyline"), timebudget=600, processes=1,
+                sizepolicy=sizepolicy, align=align)
+            img_w, img_h = calc_atlas_size(layer_rects)
+            img_w, img_h = calc_policy_size(align_up(img_w, align), align_up(img_h, align), sizepolicy)
+            self.assertEqual(img_w * img_h, min(areas))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+# GIMP SpriteAtlas sprite sheet tests
+# The frames of a sequence have to be in order of their frame number
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from spriteatlas.pngio import write_png
+from spriteatlas.spritesheet import create_spritesheet_batch, find_sequences
+
+class SequenceOrderTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.inputfolder = os.path.join(self.folder, 'in')
+        os.mkdir(self.inputfolder)
+        os.mkdir(os.path.join(self.inputfolder, 'jump'))
+        # frame numbers without leading zeros, each frame its own color
+        for i in range(1, 13):
+            write_png(os.path.join(self.inputfolder, 'run%d.png' % i), 2, 2, bytearray([i, 0, 0, 255]) * 4)
+            write_png(os.path.join(self.inputfolder, 'jump', 'j_%d.png' % i), 2, 2, bytearray([i, 0, 0, 255]) * 4)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_unpadded_numbers(self):
+        expected = ['run%d.png' % i for i in range(1, 13)]
+        sequences = dict(find_sequences(self.inputfolder))
+        self.assertEqual([os.path.basename(fn) for fn in sequences['run']], expected)
+        self.assertEqual([os.path.basename(fn) for fn in sequences['jump']], ['j_%d.png' % i for i in range(1, 13)])
+
+        create_spritesheet_batch(self.inputfolder, self.folder, processes=1)
+        with open(os.path.join(self.folder, 'run.frames.json')) as f:
+            framemap = json.load(f)
+        self.assertEqual(framemap["names"], expected)
+        self.assertEqual(framemap["frames"], list(range(12)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# GIMP SpriteAtlas writer tests
+# The binary file has to read back as the same frames, also beyond 16-bit sizes
+#
+# https://github.com/BdR76/GimpSpriteAtlas/
+
+import io
+import unittest
+
+from spriteatlas.packing import prepare_layers_metadata, calc_layers_packing, calc_atlas_size
+from spriteatlas.writers import (BINARY_MAGIC, BINARY_VERSION, binary_header, binary_page, binary_frame,
+    write_spriteatlas_binary)
+
+class layerSize(object):
+    def __init__(self, name, width, height):
+        self.name = name
+        self.width = width
+        self.height = height
+
+def read_binary(data):
+    # pages as (name, w, h) and frames as (name, page, flags, x, y, w, h, trim x, y, source w, h)
+    magic, version, pagecount, framecount, poolsize = binary_header.unpack_from(data, 0)
+    offset = binary_header.size
+    pool = data[offset + pagecount * binary_page.size + framecount * binary_frame.size:]
+    def name(start, length):
+        return pool[start:start + length].decode('utf-8')
+    pages = []
+    for i in range(pagecount):
+        values = binary_page.unpack_from(data, offset)
+        pages.append((name(values[0], values[1]),) + values[2:])
+        offset += binary_page.size
+    frames = []
+    for i in range(framecount):
+        values = binary_frame.unpack_from(data, offset)
+        frames.append((name(values[0], values[1]),) + values[2:])
+        offset += binary_frame.size
+    return magic, version, pages, frames
+
+class BinaryWriterTest(unittest.TestCase):
+    def test_large_texture(self):
+        # without a maximum size a texture can be wider than 65535 pixels
+        layers = [layerSize('wide.png', 70000, 2), layerSize('tall.png', 3, 66000), layerSize('small.png', 5, 4)]
+        layer_rects = []
+        spaces = []
+        prepare_layers_metadata(layers, layer_rects, spaces, 1)
+        calc_layers_packing(layer_rects, spaces, 1)
+        img_w, img_h = calc_atlas_size(layer_rects)
+        f = io.BytesIO()
+        write_spriteatlas_binary(f, layer_rects, 'sprites', [(img_w, img_h)])
+        magic, version, pages, frames = read_binary(f.getvalue())
+        self.assertEqual((magic, version), (BINARY_MAGIC, BINARY_VERSION))
+        self.assertEqual(pages, [('sprites.png', img_w, img_h)])
+        self.assertEqual(sorted(frames), sorted([(obj.name, 0, 0, obj.pack_x, obj.pack_y, obj.width, obj.height,
+            0, 0, obj.width, obj.height) for obj in layer_rects]))
+        self.assertTrue(max(img_w, img_h) > 65535)
+
+if __name__ == '__main__':
+    unittest.main()